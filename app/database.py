@@ -1,13 +1,56 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from app.utils.sql_functions import register_sql_functions
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DB_PATH = os.path.join(BASE_DIR, "cfg.db")
+DB_PATH = os.environ.get("CFG_DB_PATH", os.path.join(BASE_DIR, "cfg.db"))
 
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
+
+# Beberapa worker Passenger menulis ke file yang sama: WAL + busy timeout
+# mencegah "database is locked", synchronous=NORMAL cukup aman di mode WAL
+BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", 10000))
+MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", 256 * 1024 * 1024))
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    f"PRAGMA mmap_size={MMAP_SIZE}",
+    "PRAGMA temp_store=MEMORY",
+    # Wajib untuk ON DELETE CASCADE; SQLite mematikannya secara default
+    "PRAGMA foreign_keys=ON",
+)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+    # Dipakai trigger indeks pencarian (lihat app/service/search_index.py)
+    register_sql_functions(dbapi_connection)
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": BUSY_TIMEOUT_MS / 1000},
+)
+event.listen(engine, "connect", set_sqlite_pragmas)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Endpoint async memakai engine aiosqlite agar I/O SQLite tidak memblokir event loop
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    connect_args={"timeout": BUSY_TIMEOUT_MS / 1000},
+    pool_size=int(os.environ.get("DB_POOL_SIZE", 5)),
+    max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+    pool_recycle=3600,
+)
+event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Float, Index, LargeBinary, UniqueConstraint
+from sqlalchemy.orm import deferred, relationship
 from app.database import Base
+from app.model.types import CompressedJSON
 import datetime
 
 class Project(Base):
@@ -10,22 +11,131 @@ class Project(Base):
     description = Column(Text)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     
-    codes = relationship("Code", back_populates="project", cascade="all, delete-orphan")
+    # Penghapusan code dilakukan database (ON DELETE CASCADE), ORM tidak perlu memuatnya
+    codes = relationship("Code", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+
+    # Listing keyset (created_at, id) terbaru dulu
+    __table_args__ = (Index("ix_projects_created_at_id", "created_at", "id"),)
+
+class ProjectStats(Base):
+    """Per-project aggregates, kept current by triggers on codes."""
+    __tablename__ = "project_stats"
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    code_count = Column(Integer, nullable=False, default=0, server_default="0")
+    coverage_sum = Column(Float, nullable=False, default=0, server_default="0")
+    coverage_count = Column(Integer, nullable=False, default=0, server_default="0")
+    complexity_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    complexity_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Distribusi cyclomatic complexity: 1-10, 11-20, 21-50, >50
+    complexity_low = Column(Integer, nullable=False, default=0, server_default="0")
+    complexity_moderate = Column(Integer, nullable=False, default=0, server_default="0")
+    complexity_high = Column(Integer, nullable=False, default=0, server_default="0")
+    complexity_very_high = Column(Integer, nullable=False, default=0, server_default="0")
+
+class Blob(Base):
+    """Content-addressed payload shared by every Code row with the same content."""
+    __tablename__ = "blobs"
+    hash = Column(String(64), primary_key=True)
+    data = Column(CompressedJSON)
+    # Dijaga oleh trigger di tabel codes (lihat app/model/schema.py)
+    refcount = Column(Integer, nullable=False, default=0)
 
 class Code(Base):
     __tablename__ = "codes"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
-    source_code = Column(Text)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    source_code = deferred(Column(Text), group="payload")
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
     
-    path_list = Column(Text) 
-    nodes_list = Column(Text) 
-    edges_list = Column(Text) 
-    test_cases = Column(Text) 
+    # Payload besar disimpan terkompresi dan baru dimuat/di-decode saat diakses
+    path_list = deferred(Column(CompressedJSON), group="payload")
+    nodes_list = deferred(Column(CompressedJSON), group="payload")
+    edges_list = deferred(Column(CompressedJSON), group="payload")
+    test_cases = deferred(Column(CompressedJSON), group="payload")
+
+    # Baris baru menyimpan source/nodes/edges di tabel blobs; kolom inline di atas
+    # hanya terisi untuk baris lama
+    source_hash = Column(String(64), ForeignKey("blobs.hash"))
+    nodes_hash = Column(String(64), ForeignKey("blobs.hash"))
+    edges_hash = Column(String(64), ForeignKey("blobs.hash"))
 
     cyclomatic_complexity = Column(Integer)
     coverage_path = Column(Float)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
     
-    project = relationship("Project", back_populates="codes")
\ No newline at end of file
+    project = relationship("Project", back_populates="codes")
+    source_blob = relationship(Blob, foreign_keys=[source_hash])
+    nodes_blob = relationship(Blob, foreign_keys=[nodes_hash])
+    edges_blob = relationship(Blob, foreign_keys=[edges_hash])
+
+    @property
+    def source(self):
+        return self.source_blob.data if self.source_hash else self.source_code
+
+    @property
+    def nodes(self):
+        return self.nodes_blob.data if self.nodes_hash else self.nodes_list
+
+    @property
+    def edges(self):
+        return self.edges_blob.data if self.edges_hash else self.edges_list
+
+    # Juga melayani lookup per project_id (kolom terdepan)
+    __table_args__ = (Index("ix_codes_project_id_created_at_id", "project_id", "created_at", "id"),)
+
+
+class CodeFingerprint(Base):
+    """Structural CFG fingerprint: WL graph hash and MinHash signature."""
+    __tablename__ = "code_fingerprints"
+    code_id = Column(Integer, ForeignKey("codes.id", ondelete="CASCADE"), primary_key=True)
+    wl_hash = Column(String(40), nullable=False, index=True)
+    minhash = Column(LargeBinary, nullable=False)
+
+class CodeLshBand(Base):
+    """One LSH band key per (code, band); codes sharing a key are similarity candidates."""
+    __tablename__ = "code_lsh_bands"
+    band_key = Column(Integer, primary_key=True)
+    code_id = Column(Integer, ForeignKey("codes.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+class CodeRevision(Base):
+    """History of a code. Snapshot rows hold full source/nodes/edges, delta rows
+    hold the diff against the previous revision (see app/utils/delta.py)."""
+    __tablename__ = "code_revisions"
+    id = Column(Integer, primary_key=True)
+    code_id = Column(Integer, ForeignKey("codes.id", ondelete="CASCADE"), nullable=False)
+    revision = Column(Integer, nullable=False)
+    is_snapshot = Column(Boolean, nullable=False, default=False)
+
+    name = Column(String)
+    cyclomatic_complexity = Column(Integer)
+    coverage_path = Column(Float)
+    path_list = deferred(Column(CompressedJSON), group="payload")
+    test_cases = deferred(Column(CompressedJSON), group="payload")
+    source = deferred(Column(CompressedJSON), group="payload")
+    nodes = deferred(Column(CompressedJSON), group="payload")
+    edges = deferred(Column(CompressedJSON), group="payload")
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("code_id", "revision", name="uq_code_revisions_code_id_revision"),)
+
+class AnalysisJob(Base):
+    """Queued /jobs/analyze request; claimed and updated by the job workers."""
+    __tablename__ = "analysis_jobs"
+    id = Column(Integer, primary_key=True)
+    # queued -> running -> done / failed
+    status = Column(String(16), nullable=False, default="queued")
+    source_code = deferred(Column(Text, nullable=False))
+    nodes_built = Column(Integer, nullable=False, default=0)
+    paths_enumerated = Column(Integer, nullable=False, default=0)
+    result = deferred(Column(CompressedJSON))
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime)
+    # Diperbarui worker selama job jalan; lease yang kedaluwarsa membuat job di-requeue
+    heartbeat_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    # Worker mengambil job queued dengan id terkecil
+    __table_args__ = (Index("ix_analysis_jobs_status_id", "status", "id"),)
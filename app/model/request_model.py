@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, Field
 from typing import List, Dict, Any, Tuple, Set, Optional, Union
 
 class CodeRequest(BaseModel):
@@ -20,4 +20,29 @@ class SaveAnalysisRequest(BaseModel):
     path_list: List[Dict[str, Any]]
     test_cases: List[Dict[str, Any]]
     nodes: List[Dict[str, Any]]
-    edges: List[Dict[str, Any]]
\ No newline at end of file
+    edges: List[Dict[str, Any]]
+    # Diisi saat menyimpan ulang analisis yang sudah ada: jadi revisi baru, bukan code baru
+    code_id: Optional[int] = None
+    
+class BulkDeleteRequest(BaseModel):
+    project_ids: List[int] = []
+    code_ids: List[int] = []
+
+# Record /projects/import: field yang sama dengan SaveAnalysisRequest, dengan nama
+# kolom export (nama request juga diterima); null boleh karena kolomnya nullable
+class ImportProjectRecord(BaseModel):
+    id: Optional[int] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    created_at: Optional[str] = None
+
+class ImportCodeRecord(BaseModel):
+    name: Optional[str] = None
+    source_code: str = Field(validation_alias=AliasChoices("source_code", "code"))
+    cyclomatic_complexity: Optional[int] = None
+    coverage_path: Optional[float] = None
+    path_list: Optional[List[Dict[str, Any]]] = None
+    test_cases: Optional[List[Dict[str, Any]]] = None
+    nodes_list: Optional[List[Dict[str, Any]]] = Field(None, validation_alias=AliasChoices("nodes_list", "nodes"))
+    edges_list: Optional[List[Dict[str, Any]]] = Field(None, validation_alias=AliasChoices("edges_list", "edges"))
+    created_at: Optional[str] = None
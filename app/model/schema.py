@@ -0,0 +1,243 @@
+"""Schema upgrades that create_all cannot do on an existing SQLite file.
+
+create_all only creates missing tables, so columns, constraints and triggers
+added after a database was first created are applied here. Every step is
+idempotent.
+"""
+import logging
+import re
+
+from sqlalchemy.schema import CreateTable
+
+from app.model.models import Code
+
+logger = logging.getLogger(__name__)
+
+# (tabel, kolom, definisi) yang ditambahkan setelah rilis awal
+ADDED_COLUMNS = (
+    ("codes", "source_hash", "VARCHAR(64) REFERENCES blobs (hash)"),
+    ("codes", "nodes_hash", "VARCHAR(64) REFERENCES blobs (hash)"),
+    ("codes", "edges_hash", "VARCHAR(64) REFERENCES blobs (hash)"),
+    ("analysis_jobs", "heartbeat_at", "DATETIME"),
+)
+
+# Tabel yang dipaginasi keyset pada (created_at, id): baris lama tanpa created_at
+# diisi sekali, karena perbandingan tuple dengan NULL tidak pernah benar
+KEYSET_TABLES = ("projects", "codes")
+
+# Index yang dideklarasikan di models setelah tabelnya sudah ada di database lama
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_projects_created_at_id ON projects (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_codes_created_at ON codes (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_codes_project_id_created_at_id ON codes (project_id, created_at, id)",
+)
+
+# Reference counting blob: naik saat code dibuat, turun (dan blob yatim dihapus)
+# saat code dihapus, termasuk penghapusan lewat cascade di level database
+TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS codes_blob_ref AFTER INSERT ON codes BEGIN
+        UPDATE blobs SET refcount = refcount + 1 WHERE hash = NEW.source_hash;
+        UPDATE blobs SET refcount = refcount + 1 WHERE hash = NEW.nodes_hash;
+        UPDATE blobs SET refcount = refcount + 1 WHERE hash = NEW.edges_hash;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS codes_blob_unref AFTER DELETE ON codes BEGIN
+        UPDATE blobs SET refcount = refcount - 1 WHERE hash = OLD.source_hash;
+        UPDATE blobs SET refcount = refcount - 1 WHERE hash = OLD.nodes_hash;
+        UPDATE blobs SET refcount = refcount - 1 WHERE hash = OLD.edges_hash;
+        DELETE FROM blobs WHERE refcount <= 0
+            AND hash IN (OLD.source_hash, OLD.nodes_hash, OLD.edges_hash);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS codes_blob_reref
+    AFTER UPDATE OF source_hash, nodes_hash, edges_hash ON codes BEGIN
+        UPDATE blobs SET refcount = refcount + 1 WHERE hash = NEW.source_hash;
+        UPDATE blobs SET refcount = refcount + 1 WHERE hash = NEW.nodes_hash;
+        UPDATE blobs SET refcount = refcount + 1 WHERE hash = NEW.edges_hash;
+        UPDATE blobs SET refcount = refcount - 1 WHERE hash = OLD.source_hash;
+        UPDATE blobs SET refcount = refcount - 1 WHERE hash = OLD.nodes_hash;
+        UPDATE blobs SET refcount = refcount - 1 WHERE hash = OLD.edges_hash;
+        DELETE FROM blobs WHERE refcount <= 0
+            AND hash IN (OLD.source_hash, OLD.nodes_hash, OLD.edges_hash);
+    END
+    """,
+)
+
+
+def _stats_delta(ref, sign):
+    cc = f"{ref}.cyclomatic_complexity"
+    return f"""
+        UPDATE project_stats SET
+            code_count = code_count {sign} 1,
+            coverage_sum = coverage_sum {sign} COALESCE({ref}.coverage_path, 0),
+            coverage_count = coverage_count {sign} ({ref}.coverage_path IS NOT NULL),
+            complexity_sum = complexity_sum {sign} COALESCE({cc}, 0),
+            complexity_count = complexity_count {sign} ({cc} IS NOT NULL),
+            complexity_low = complexity_low {sign} (({cc} <= 10) IS 1),
+            complexity_moderate = complexity_moderate {sign} (({cc} BETWEEN 11 AND 20) IS 1),
+            complexity_high = complexity_high {sign} (({cc} BETWEEN 21 AND 50) IS 1),
+            complexity_very_high = complexity_very_high {sign} (({cc} > 50) IS 1)
+        WHERE project_id = {ref}.project_id;
+    """
+
+
+# Statistik project diperbarui per baris code, termasuk delete lewat cascade.
+# Code tanpa project (project_id NULL, mis. yatim setelah rebuild) tidak dihitung:
+# INSERT ke project_stats dengan project_id NULL akan melanggar foreign key
+STATS_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS codes_stats_insert AFTER INSERT ON codes
+    WHEN NEW.project_id IS NOT NULL BEGIN
+        INSERT OR IGNORE INTO project_stats (project_id) VALUES (NEW.project_id);
+        {_stats_delta("NEW", "+")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS codes_stats_delete AFTER DELETE ON codes
+    WHEN OLD.project_id IS NOT NULL BEGIN
+        {_stats_delta("OLD", "-")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS codes_stats_update_old
+    AFTER UPDATE OF project_id, coverage_path, cyclomatic_complexity ON codes
+    WHEN OLD.project_id IS NOT NULL BEGIN
+        {_stats_delta("OLD", "-")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS codes_stats_update
+    AFTER UPDATE OF project_id, coverage_path, cyclomatic_complexity ON codes
+    WHEN NEW.project_id IS NOT NULL BEGIN
+        INSERT OR IGNORE INTO project_stats (project_id) VALUES (NEW.project_id);
+        {_stats_delta("NEW", "+")}
+    END
+    """,
+)
+
+STATS_BACKFILL = """
+    INSERT OR REPLACE INTO project_stats (
+        project_id, code_count, coverage_sum, coverage_count, complexity_sum, complexity_count,
+        complexity_low, complexity_moderate, complexity_high, complexity_very_high
+    )
+    SELECT
+        project_id, COUNT(*), TOTAL(coverage_path), COUNT(coverage_path),
+        TOTAL(cyclomatic_complexity), COUNT(cyclomatic_complexity),
+        SUM((cyclomatic_complexity <= 10) IS 1),
+        SUM((cyclomatic_complexity BETWEEN 11 AND 20) IS 1),
+        SUM((cyclomatic_complexity BETWEEN 21 AND 50) IS 1),
+        SUM((cyclomatic_complexity > 50) IS 1)
+    FROM codes
+    WHERE project_id IN (SELECT id FROM projects)
+    GROUP BY project_id
+"""
+
+
+def _columns(connection, table):
+    return {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def _codes_cascade_missing(connection):
+    for row in connection.exec_driver_sql("PRAGMA foreign_key_list(codes)"):
+        if row[2] == "projects" and row[6].upper() != "CASCADE":
+            return True
+    return False
+
+
+def rebuild_codes_table(engine):
+    """Recreate codes from the model so its foreign keys get ON DELETE CASCADE.
+
+    SQLite cannot alter a constraint in place, so this follows its documented
+    procedure: foreign keys off (outside the transaction, where the pragma has
+    effect), copy into a new table, drop the old one, rename, foreign_key_check,
+    commit, foreign keys on. With foreign keys on, DROP TABLE would delete every
+    row of codes first and cascade into the tables that reference it.
+
+    Codes whose project no longer exists keep their data with project_id NULL.
+    Any other violation rolls the rebuild back; the old table stays in use and
+    the rebuild is retried on the next start.
+    """
+    table = Code.__table__
+    ddl = str(CreateTable(table).compile(dialect=engine.dialect))
+    columns = ", ".join(column.name for column in table.columns)
+    with engine.connect() as connection:
+        # Transaksi dikelola sendiri: PRAGMA foreign_keys diabaikan di dalam transaksi
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        try:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                orphans = connection.exec_driver_sql(
+                    "UPDATE codes SET project_id = NULL WHERE project_id IS NOT NULL"
+                    " AND project_id NOT IN (SELECT id FROM projects)"
+                ).rowcount
+                if orphans:
+                    logger.warning("codes rebuild: %d code(s) without an existing project set to project_id NULL", orphans)
+                connection.exec_driver_sql("DROP TABLE IF EXISTS codes_rebuild")
+                connection.exec_driver_sql(ddl.replace("CREATE TABLE codes", "CREATE TABLE codes_rebuild", 1))
+                connection.exec_driver_sql(f"INSERT INTO codes_rebuild ({columns}) SELECT {columns} FROM codes")
+                # RENAME gagal selama ada view ke tabel yang tidak ada;
+                # ensure_search_index membuat ulang view dan trigger FTS-nya
+                connection.exec_driver_sql("DROP VIEW IF EXISTS codes_search")
+                connection.exec_driver_sql("DROP TABLE codes")
+                connection.exec_driver_sql("ALTER TABLE codes_rebuild RENAME TO codes")
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+                violations = connection.exec_driver_sql("PRAGMA foreign_key_check").all()
+                if violations:
+                    raise RuntimeError(f"foreign key violations after rebuild: {violations[:10]}")
+                connection.exec_driver_sql("COMMIT")
+            except Exception:
+                connection.exec_driver_sql("ROLLBACK")
+                logger.exception("codes rebuild rolled back; keeping the old codes table")
+        finally:
+            connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+
+def upgrade_schema(engine):
+    with engine.begin() as connection:
+        existing = {}
+        for table, column, ddl in ADDED_COLUMNS:
+            if table not in existing:
+                existing[table] = _columns(connection, table)
+            if column not in existing[table]:
+                connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+                existing[table].add(column)
+        rebuild = _codes_cascade_missing(connection)
+    # Di luar transaksi di atas: rebuild butuh foreign_keys=OFF
+    if rebuild:
+        rebuild_codes_table(engine)
+    with engine.begin() as connection:
+        _upgrade_indexes_and_triggers(connection)
+
+
+def _create_trigger(connection, ddl):
+    """CREATE TRIGGER IF NOT EXISTS, replacing a trigger of the same name whose definition changed."""
+    name = re.search(r"CREATE TRIGGER IF NOT EXISTS (\w+)", ddl).group(1)
+    stored = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)
+    ).scalar()
+    # SQLite menyimpan teks CREATE tanpa IF NOT EXISTS
+    wanted = " ".join(ddl.replace("IF NOT EXISTS ", "", 1).split())
+    if stored is not None and " ".join(stored.split()) != wanted:
+        connection.exec_driver_sql(f"DROP TRIGGER {name}")
+    connection.exec_driver_sql(ddl)
+
+
+def _upgrade_indexes_and_triggers(connection):
+    for index in INDEXES:
+        connection.exec_driver_sql(index)
+    for table in KEYSET_TABLES:
+        # Waktu tertua yang ada: tetap di akhir urutan, seperti NULL sebelumnya
+        connection.exec_driver_sql(
+            f"UPDATE {table} SET created_at = "
+            f"COALESCE((SELECT MIN(created_at) FROM {table}), CURRENT_TIMESTAMP) WHERE created_at IS NULL"
+        )
+    for trigger in TRIGGERS + STATS_TRIGGERS:
+        _create_trigger(connection, trigger)
+    # Database yang dibuat sebelum project_stats ada perlu diisi sekali
+    if connection.exec_driver_sql("SELECT 1 FROM project_stats LIMIT 1").first() is None:
+        connection.exec_driver_sql(STATS_BACKFILL)
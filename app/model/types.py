@@ -0,0 +1,64 @@
+import json
+import zlib
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Byte pertama blob menandai codec, supaya data lama tetap bisa dibaca
+# walaupun dependensi opsional berubah
+CODEC_MSGPACK_ZLIB = 1
+CODEC_MSGPACK_ZSTD = 2
+CODEC_JSON_ZLIB = 3
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def encode_payload(value):
+    if msgpack is not None:
+        raw = msgpack.packb(value, use_bin_type=True)
+        if zstandard is not None:
+            return bytes([CODEC_MSGPACK_ZSTD]) + zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+        return bytes([CODEC_MSGPACK_ZLIB]) + zlib.compress(raw, ZLIB_LEVEL)
+    raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    return bytes([CODEC_JSON_ZLIB]) + zlib.compress(raw, ZLIB_LEVEL)
+
+
+def decode_payload(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        # Baris lama yang belum dimigrasi masih berupa teks JSON
+        return json.loads(value) if value else None
+    codec, body = value[0], value[1:]
+    if codec == CODEC_MSGPACK_ZLIB:
+        return msgpack.unpackb(zlib.decompress(body), raw=False)
+    if codec == CODEC_MSGPACK_ZSTD:
+        return msgpack.unpackb(zstandard.ZstdDecompressor().decompress(body), raw=False)
+    if codec == CODEC_JSON_ZLIB:
+        return json.loads(zlib.decompress(body))
+    raise ValueError(f"Unknown payload codec: {codec}")
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON-compatible value stored as a compressed msgpack blob."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return encode_payload(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_payload(value)
@@ -0,0 +1,99 @@
+"""Admission control for the expensive endpoints.
+
+Every request is estimated first (app/service/cost_model.py). Requests above
+ADMISSION_MAX_SYNC_COST are moved to the job queue when the endpoint allows
+it, requests above ADMISSION_MAX_JOB_COST are rejected outright, and every
+admitted request is charged its estimated cost against the client's token
+bucket. Cost units are roughly node visits of the path enumerator, about a
+microsecond each.
+
+Building the CFG for the estimate is quadratic in the source size, so a
+request that is queued anyway (POST /jobs/analyze, or a source above
+ADMISSION_MAX_SYNC_AST_NODES) is admitted on its AST counts alone. The
+worker then applies the path-count limit itself (check_job_cost).
+"""
+import math
+import os
+
+from app.service.cost_model import MAX_AST_NODES
+from app.utils.rate_limit import TokenBucketLimiter
+
+MAX_SYNC_COST = int(os.environ.get("ADMISSION_MAX_SYNC_COST", 2_000_000))
+MAX_JOB_COST = int(os.environ.get("ADMISSION_MAX_JOB_COST", 100_000_000))
+# Di atas ini CFG tidak dibangun saat admission (~0.1 s) dan request langsung jadi job
+MAX_SYNC_AST_NODES = int(os.environ.get("ADMISSION_MAX_SYNC_AST_NODES", 10_000))
+BUCKET_CAPACITY = int(os.environ.get("ADMISSION_BUCKET_CAPACITY", 5_000_000))
+BUCKET_REFILL_PER_SEC = int(os.environ.get("ADMISSION_BUCKET_REFILL_PER_SEC", 500_000))
+# Di belakang reverse proxy alamat klien asli ada di X-Forwarded-For
+TRUST_FORWARDED = os.environ.get("ADMISSION_TRUST_FORWARDED", "0") == "1"
+
+SYNC = "sync"
+JOB = "job"
+
+limiter = TokenBucketLimiter(BUCKET_CAPACITY, BUCKET_REFILL_PER_SEC)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code, detail, retry_after=None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    @property
+    def headers(self):
+        if self.retry_after is None:
+            return None
+        return {"Retry-After": str(self.retry_after)}
+
+
+def client_key(request):
+    if TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def queue_without_cfg(estimate, allow_job):
+    """Whether a shallow (AST only) estimate is enough: the request is going to the job queue."""
+    return allow_job and estimate is not None and estimate["ast_nodes"] > MAX_SYNC_AST_NODES
+
+
+def _too_expensive(estimate, cost, limit):
+    return (f"Analysis too expensive: about {estimate['estimated_paths']} execution paths "
+            f"(estimated cost {cost}, max {limit}).")
+
+
+def check_job_cost(estimate):
+    """Path-count limit of a job admitted on its AST alone, applied by the worker after building the CFG."""
+    if estimate is not None and estimate["cost"] > MAX_JOB_COST:
+        raise AdmissionRejected(413, _too_expensive(estimate, estimate["cost"], MAX_JOB_COST))
+
+
+def admit(key, estimate, allow_job=False, shared=False, queue=False):
+    """Return SYNC or JOB for an admitted request, raise AdmissionRejected otherwise.
+
+    shared=True means an identical analysis is already running and the request
+    will only wait for it, so just the estimate itself is charged. queue=True
+    means the request goes to the job queue on a shallow estimate; only its
+    AST size is checked and charged here.
+    """
+    if estimate is None:
+        # Tidak bisa di-parse: gagal cepat di tahap analisis, cukup biaya minimal
+        cost = 1
+    else:
+        cost = estimate["ast_nodes"] if shared else estimate["cost"]
+        if estimate["ast_nodes"] > MAX_AST_NODES:
+            raise AdmissionRejected(413, f"Code too large: {estimate['ast_nodes']} AST nodes (max {MAX_AST_NODES}).")
+
+    mode = JOB if queue else SYNC
+    if not queue and cost > MAX_SYNC_COST:
+        if not allow_job or cost > MAX_JOB_COST:
+            raise AdmissionRejected(413, _too_expensive(estimate, cost, MAX_JOB_COST if allow_job else MAX_SYNC_COST))
+        mode = JOB
+
+    wait = limiter.acquire(key, cost)
+    if wait > 0:
+        raise AdmissionRejected(429, "Analysis quota exceeded, try again later.", retry_after=math.ceil(wait))
+    return mode
@@ -0,0 +1,42 @@
+from app.service.cfg_builder import build_cfg
+from app.service.instrumentation import observe_graph, stage
+from app.service.path_builder import generate_execution_paths
+from app.utils.cancellation import checkpoint
+from app.utils.unreachable_nodes import detect_unreachable_code
+
+
+def analyze_source(code, progress=None, cancelled=None, cfg=None):
+    """CFG, execution paths and metrics of one source, or None if it cannot be processed.
+
+    progress(nodes_built, paths_enumerated) is called after the CFG is built and
+    for every path found during enumeration. Setting the cancelled event aborts
+    the analysis with Cancelled. A cfg already built by build_cfg(code) (e.g.
+    during the cost estimate) is reused and extended in place.
+    """
+    if cfg is None:
+        cfg = build_cfg(code)
+    checkpoint(cancelled)
+
+    if cfg is None or "message" in cfg:
+        return None
+
+    nodes_built = len(cfg["nodes"])
+    on_path = None
+    if progress is not None:
+        progress(nodes_built, 0)
+        on_path = lambda paths: progress(nodes_built, paths)
+
+    with stage("paths"):
+        paths = generate_execution_paths(cfg, on_path, cancelled)
+    cfg["execution_paths"] = paths
+
+    # Calculate cyclomatic complexity: E - N + 2
+    cfg["cyclomatic_complexity"] = len(cfg["edges"]) - len(cfg["nodes"]) + 2
+    cfg["nodes_count"] = len(cfg["nodes"])
+    cfg["edges_count"] = len(cfg["edges"])
+
+    with stage("unreachable"):
+        unreachable = detect_unreachable_code(cfg)
+    cfg["unreachable_code"] = unreachable
+    observe_graph(cfg)
+    return cfg
@@ -0,0 +1,80 @@
+import hashlib
+import json
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+
+from app.model.models import Blob, Code
+from app.model.types import decode_payload
+from app.service.instrumentation import observe_cache
+
+# Kolom inline -> kolom hash di tabel codes
+BLOB_FIELDS = (
+    ("source_code", "source_hash"),
+    ("nodes_list", "nodes_hash"),
+    ("edges_list", "edges_hash"),
+)
+
+# Dipakai query yang membaca source/nodes/edges supaya blob dimuat dalam satu IN query
+BLOB_LOAD_OPTIONS = (
+    selectinload(Code.source_blob),
+    selectinload(Code.nodes_blob),
+    selectinload(Code.edges_blob),
+)
+
+
+def content_hash(value):
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def dedupe_payloads(connection, rows):
+    """Move source/nodes/edges of code rows into the blobs table.
+
+    Returns new row dicts that reference blobs by hash. Only blobs that are not
+    stored yet get compressed and inserted; refcounts are kept by triggers.
+    """
+    blobs = {}
+    prepared = []
+    for row in rows:
+        row = dict(row)
+        for field, hash_field in BLOB_FIELDS:
+            value = row.pop(field, None)
+            if value is None:
+                row[hash_field] = None
+                continue
+            digest = content_hash(value)
+            blobs.setdefault(digest, value)
+            row[hash_field] = digest
+        prepared.append(row)
+
+    if blobs:
+        existing = set(connection.scalars(select(Blob.hash).where(Blob.hash.in_(list(blobs)))))
+        missing = [
+            {"hash": digest, "data": value, "refcount": 0}
+            for digest, value in blobs.items()
+            if digest not in existing
+        ]
+        if missing:
+            connection.execute(insert(Blob), missing)
+        observe_cache("blob", len(blobs) - len(missing), len(missing))
+    return prepared
+
+
+def iter_code_payloads(connection):
+    """Yield (id, name, source, nodes, edges) for every code, blob-backed or inline."""
+    rows = connection.exec_driver_sql("""
+        SELECT c.id, c.name,
+               COALESCE(sb.data, c.source_code),
+               COALESCE(nb.data, c.nodes_list),
+               COALESCE(eb.data, c.edges_list)
+        FROM codes c
+        LEFT JOIN blobs sb ON sb.hash = c.source_hash
+        LEFT JOIN blobs nb ON nb.hash = c.nodes_hash
+        LEFT JOIN blobs eb ON eb.hash = c.edges_hash
+        ORDER BY c.id
+    """)
+    for code_id, name, source, nodes, edges in rows:
+        if isinstance(source, bytes):
+            source = decode_payload(source)
+        yield code_id, name, source, decode_payload(nodes), decode_payload(edges)
@@ -1,10 +1,40 @@
 import ast
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import List, Dict, Any, Tuple, Set, Optional, Union
 
+from app.service.instrumentation import stage
+from app.utils.process_context import process_context
+
+# Modul kecil lebih cepat dibangun serial; overhead pool baru terbayar di atas ukuran ini
+PARALLEL_MIN_AST_NODES = int(os.environ.get("CFG_PARALLEL_MIN_AST_NODES", 4000))
+CFG_WORKERS = int(os.environ.get("CFG_WORKERS", os.cpu_count() or 1))
+
+# Parent sementara untuk statement pertama sebuah chunk, diganti saat merge
+ENTRY_PLACEHOLDER = "0"
+
+_pool = None
+_pool_lock = threading.Lock()
+# Dimatikan di proses worker job: N worker x CFG_WORKERS proses akan berlipat ganda
+_parallel_build = True
+
+def set_parallel_build(enabled):
+    global _parallel_build
+    _parallel_build = enabled
+
 def build_cfg(code: str):
     try:
-        tree = ast.parse(code)
-        nodes, edges, parameters = extract_cfg(tree)
+        with stage("parse"):
+            tree = ast.parse(code)
+        with stage("extract_cfg"):
+            chunks = partition_statements(tree) if _parallel_build else [tree.body]
+            if len(chunks) > 1:
+                nodes, edges, parameters = extract_cfg_parallel(chunks)
+            else:
+                nodes, edges, parameters = extract_cfg(tree)
         return {
             "nodes": nodes,
             "edges": edges,
@@ -34,8 +64,17 @@ def get_exit_nodes(result):
     else:
         return [result]
 
-    
+
 def extract_cfg(tree):
+    nodes, edges, parameters, final_exits, last_nodes = extract_fragment(tree.body)
+    return finish_cfg(nodes, edges, parameters, final_exits, last_nodes)
+
+def extract_fragment(stmts, entry_ids=None):
+    """Walk a run of root-level statements with local ids starting at "1".
+
+    Without entry_ids the fragment opens with the Start node; otherwise the first
+    statement is linked to each of entry_ids.
+    """
     nodes = []
     edges = []
     parameters = []
@@ -271,11 +310,17 @@ def extract_cfg(tree):
                 current_ids = visit(stmt, current_ids, depth, branch_index, is_else)
         return current_ids
 
-    # Start Node
-    start_id = add_node("Start", None, {"x": x_offset, "y": 50}, "control")
+    if entry_ids is None:
+        # Start Node
+        start_id = add_node("Start", None, {"x": x_offset, "y": 50}, "control")
+        entry_ids = [start_id]
     
     # Process all root-level statements
-    final_exits = visit_block(tree.body, [start_id], 0, 0, False)
+    final_exits = visit_block(stmts, entry_ids, 0, 0, False)
+    return nodes, edges, parameters, final_exits, last_nodes
+
+def finish_cfg(nodes, edges, parameters, final_exits, last_nodes):
+    x_offset = 450
     
     # Filter out function definitions from being the SOLE exit of the file
     # (to avoid the "Path: 1" issue where it just defines the function and ends)
@@ -292,18 +337,132 @@ def extract_cfg(tree):
     # End Node
     if nodes:
         end_pos = {"x": x_offset, "y": (len(nodes) + 1) * 80}
-        end_id = add_node("End", None, end_pos, "control")
+        end_id = str(len(nodes) + 1)
+        nodes.append({
+            "id": end_id,
+            "type": "custom",
+            "position": end_pos,
+            "data": {
+                "label": "End",
+                "tooltip": "End",
+                "lineno": None,
+                "node_type": "control"
+            }
+        })
         
         seen_edges = set()
         for final_node in last_nodes:
             if final_node and final_node != end_id and (final_node, end_id) not in seen_edges:
                 # Check if it was a condition/loop to add "False" label
+                # (id node = posisinya + 1, jadi tidak perlu memindai semua node)
                 lbl = ""
-                for n in nodes:
-                    if n["id"] == final_node and n["data"]["node_type"] in ["condition", "loop"]:
-                        lbl = "False"
-                        break
-                create_edge(final_node, end_id, lbl)
+                if nodes[int(final_node) - 1]["data"]["node_type"] in ["condition", "loop"]:
+                    lbl = "False"
+                edge_data = {
+                    "id": f"e{final_node}-{end_id}",
+                    "source": final_node,
+                    "target": end_id,
+                    "markerEnd": {"type": "arrowclosed", "color": "#000000"},
+                    "style": {"strokeWidth": 2, "stroke": "#000000"}
+                }
+                if lbl:
+                    edge_data["label"] = lbl
+                edges.append(edge_data)
                 seen_edges.add((final_node, end_id))
     
     return nodes, edges, parameters
+
+def partition_statements(tree, max_chunks=None):
+    """Split root-level statements into contiguous chunks of similar AST size.
+
+    Returns a single chunk when the module is too small to be worth a process pool.
+    """
+    stmts = tree.body
+    max_chunks = max_chunks or CFG_WORKERS
+    weights = [sum(1 for _ in ast.walk(stmt)) for stmt in stmts]
+    total = sum(weights)
+    units = sum(1 for stmt in stmts if isinstance(stmt, (ast.FunctionDef, ast.ClassDef)))
+    if max_chunks < 2 or units < 2 or total < PARALLEL_MIN_AST_NODES:
+        return [stmts]
+
+    target = total / min(max_chunks, len(stmts))
+    chunks = []
+    current = []
+    size = 0
+    for stmt, weight in zip(stmts, weights):
+        current.append(stmt)
+        size += weight
+        if size >= target:
+            chunks.append(current)
+            current = []
+            size = 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _build_chunk(args):
+    stmts, is_first = args
+    return extract_fragment(stmts, None if is_first else [ENTRY_PLACEHOLDER])
+
+def _get_pool():
+    global _pool
+    # Dibuat dari thread executor; lock agar dua request tidak membuat dua pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=CFG_WORKERS, mp_context=process_context())
+        return _pool
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+# Passenger (a2wsgi) tidak mengirim event lifespan, jadi pool juga ditutup saat proses keluar
+atexit.register(shutdown_pool)
+
+def extract_cfg_parallel(chunks):
+    """Build each chunk in a worker process and merge them into one graph.
+
+    Ids are shifted by the number of nodes before each chunk, so the result is
+    identical to a serial extract_cfg over the same statements.
+    """
+    jobs = [(stmts, i == 0) for i, stmts in enumerate(chunks)]
+    try:
+        fragments = list(_get_pool().map(_build_chunk, jobs))
+    except BrokenProcessPool:
+        shutdown_pool()
+        fragments = [_build_chunk(job) for job in jobs]
+
+    nodes, edges, parameters, final_exits, last_nodes = fragments[0]
+    for f_nodes, f_edges, f_parameters, f_exits, f_last in fragments[1:]:
+        offset = len(nodes)
+        shift = lambda node_id: str(int(node_id) + offset)
+
+        for node in f_nodes:
+            node["id"] = shift(node["id"])
+            node["position"]["y"] += offset * 80
+            nodes.append(node)
+
+        for edge in f_edges:
+            target = shift(edge["target"])
+            if edge["source"] == ENTRY_PLACEHOLDER:
+                sources = final_exits
+            else:
+                sources = [shift(edge["source"])]
+            for source in sources:
+                edges.append({
+                    **edge,
+                    "id": f"e{source}-{target}",
+                    "source": source,
+                    "target": target,
+                    "markerEnd": dict(edge["markerEnd"]),
+                    "style": dict(edge["style"])
+                })
+
+        parameters.extend(f_parameters)
+        last_nodes.extend(shift(n) for n in f_last)
+        final_exits = [shift(n) for n in f_exits]
+
+    return finish_cfg(nodes, edges, parameters, final_exits, last_nodes)
@@ -0,0 +1,15 @@
+from app.service import similarity
+
+
+def index_new_codes(connection, rows, ids):
+    """Secondary indexes for freshly inserted code rows, run in the insert transaction.
+
+    The full-text index is kept by triggers (app/service/search_index.py).
+    """
+    similarity.index_fingerprints(connection, rows, ids)
+
+
+def reindex_code(connection, row, code_id):
+    """Refresh the secondary indexes after a code's head content changed."""
+    similarity.remove_fingerprints(connection, [code_id])
+    index_new_codes(connection, [row], [code_id])
@@ -0,0 +1,125 @@
+"""Cheap cost estimate of an analysis, computed before the expensive stages.
+
+Path enumeration is exponential in the number of sequential decisions, so the
+estimate counts paths with dynamic programming over the CFG (linear in its
+size) instead of enumerating them. The work estimate is the total number of
+node visits the enumeration would make, which is what its running time tracks.
+"""
+import ast
+import os
+
+from app.service.cfg_builder import build_cfg
+from app.utils.cancellation import checkpoint
+
+# Sumber dengan AST lebih besar dari ini ditolak sebelum CFG dibangun
+MAX_AST_NODES = int(os.environ.get("ADMISSION_MAX_AST_NODES", 50000))
+
+DECISION_NODES = (
+    ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.Try, ast.ExceptHandler,
+    ast.BoolOp, ast.comprehension, ast.With, ast.AsyncWith,
+)
+if hasattr(ast, "Match"):
+    DECISION_NODES += (ast.match_case,)
+
+
+def count_ast(tree):
+    """(node count, decision count) of a parsed module."""
+    nodes = 0
+    decisions = 0
+    for node in ast.walk(tree):
+        nodes += 1
+        if isinstance(node, DECISION_NODES):
+            decisions += 1
+    return nodes, decisions
+
+
+def count_paths(cfg):
+    """(path count, total node visits) that generate_execution_paths would produce.
+
+    Uses the same graph as the enumerator: "loop back" edges are skipped, the
+    walk starts at node "1" and stops at nodes without successors or at End.
+    Any remaining cycle edge is ignored, so the result is an estimate.
+    """
+    graph = {node["id"]: [] for node in cfg["nodes"]}
+    for edge in cfg["edges"]:
+        if edge.get("label", "") != "loop back":
+            graph.setdefault(edge["source"], []).append(edge["target"])
+    end_nodes = {node_id for node_id, targets in graph.items() if not targets}
+    end_nodes.update(node["id"] for node in cfg["nodes"] if node["data"]["label"] == "End")
+
+    start = "1"
+    if start not in graph:
+        return 0, 0
+
+    # DP pasca-urut iteratif: paths[v] = jumlah path v -> end, work[v] = total node di path tsb.
+    paths = {}
+    work = {}
+    on_stack = set()
+    stack = [(start, False)]
+    while stack:
+        node_id, expanded = stack.pop()
+        if node_id in paths:
+            continue
+        if node_id in end_nodes:
+            paths[node_id] = 1
+            work[node_id] = 1
+            continue
+        if expanded:
+            on_stack.discard(node_id)
+            count = 0
+            visits = 0
+            for target in graph.get(node_id, []):
+                # Target yang belum selesai berarti siklus: tidak dihitung
+                count += paths.get(target, 0)
+                visits += work.get(target, 0)
+            paths[node_id] = count
+            work[node_id] = visits + count
+            continue
+        on_stack.add(node_id)
+        stack.append((node_id, True))
+        for target in graph.get(node_id, []):
+            if target not in paths and target not in on_stack:
+                stack.append((target, False))
+    return paths[start], work[start]
+
+
+def estimate_cost(code, cancelled=None, shallow=False):
+    """Cost estimate of analysing code; "cfg" is the built CFG so it does not have to be built twice.
+
+    shallow=True only counts the AST (no CFG, no paths): enough for a request
+    that joins an identical analysis already running. Returns None when the
+    source cannot be parsed.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    ast_nodes, decisions = count_ast(tree)
+    estimate = {
+        "ast_nodes": ast_nodes,
+        "decisions": decisions,
+        "cfg_nodes": None,
+        "estimated_paths": None,
+        "cost": ast_nodes,
+        "cfg": None,
+    }
+    if shallow or ast_nodes > MAX_AST_NODES:
+        # Yang menumpang cukup AST-nya; yang terlalu besar bahkan tidak dibangun CFG-nya
+        return estimate
+
+    cfg = build_cfg(code)
+    checkpoint(cancelled)
+    if cfg is None or "message" in cfg:
+        return estimate
+    path_count, visits = count_paths(cfg)
+    estimate.update(
+        cfg_nodes=len(cfg["nodes"]),
+        estimated_paths=path_count,
+        cost=ast_nodes + visits,
+        cfg=cfg,
+    )
+    return estimate
+
+
+def public_estimate(estimate):
+    return {key: value for key, value in estimate.items() if key != "cfg"}
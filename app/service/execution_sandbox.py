@@ -0,0 +1,90 @@
+"""Run /test_execution/ user code in a separate process.
+
+The process is killed as soon as the awaiting request is cancelled (client
+disconnect), so an endless loop in user code no longer keeps running in the
+server after the tab is closed. A crash or sys.exit() in user code only takes
+down the child, and a child still running after EXECUTION_TIMEOUT is killed;
+both are reported as ExecutionFailed (the code's fault, not the server's).
+"""
+import asyncio
+import os
+import pickle
+import time
+
+from app.service.instrumentation import observe_stage
+from app.service.execution_tester import test_code_with_parameters, trace_execution_path
+from app.utils.process_context import process_context
+
+EXECUTION_TIMEOUT = float(os.environ.get("EXECUTION_TIMEOUT_S", 10))
+
+
+class ExecutionFailed(Exception):
+    def __init__(self, detail, status_code=422):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _is_picklable(value):
+    try:
+        pickle.dumps(value)
+        return True
+    except Exception:
+        return False
+
+
+def _child(conn, code, parameters):
+    try:
+        start = time.perf_counter()
+        execution_result = test_code_with_parameters(code, parameters)
+        executed = time.perf_counter()
+        # Nilai kembalian yang tidak bisa dikirim antar proses dikirim sebagai teks
+        return_value = execution_result["return_value"]
+        if not _is_picklable(return_value):
+            execution_result["return_value"] = str(return_value)
+        actual_path = trace_execution_path(code, parameters)
+        timings = {"exec": executed - start, "trace": time.perf_counter() - executed}
+        conn.send(("ok", (execution_result, actual_path, timings)))
+    except Exception as e:
+        conn.send(("error", e if _is_picklable(e) else RuntimeError(str(e))))
+    finally:
+        conn.close()
+
+
+def _receive(conn, timeout):
+    try:
+        if not conn.poll(timeout):
+            return ("timeout", None)
+        return conn.recv()
+    except EOFError:
+        return ("exited", None)
+    finally:
+        conn.close()
+
+
+async def run_execution(code, parameters):
+    """test_code_with_parameters and trace_execution_path in a child process."""
+    context = process_context()
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_child, args=(child_conn, code, parameters), daemon=True)
+    process.start()
+    child_conn.close()
+    loop = asyncio.get_running_loop()
+    status = None
+    try:
+        status, payload = await loop.run_in_executor(None, _receive, parent_conn, EXECUTION_TIMEOUT)
+    finally:
+        if status in (None, "timeout"):
+            # Dibatalkan (klien putus) atau melewati batas waktu; recv di thread executor selesai dengan EOFError
+            process.kill()
+        await asyncio.shield(loop.run_in_executor(None, process.join))
+    if status == "timeout":
+        raise ExecutionFailed(f"Execution did not finish within {EXECUTION_TIMEOUT:g} seconds.")
+    if status == "exited":
+        raise ExecutionFailed(f"Execution process exited unexpectedly (exit code {process.exitcode}).")
+    if status == "error":
+        raise payload
+    execution_result, actual_path, timings = payload
+    for name, seconds in timings.items():
+        observe_stage(name, seconds)
+    return execution_result, actual_path
@@ -0,0 +1,108 @@
+import asyncio
+import contextvars
+import os
+
+from sqlalchemy import insert
+
+# Batas baris per transaksi dan waktu tunggu untuk mengumpulkan batch
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get("GROUP_COMMIT_MAX_BATCH", 200))
+GROUP_COMMIT_MAX_DELAY = float(os.environ.get("GROUP_COMMIT_MAX_DELAY_MS", 2)) / 1000
+
+
+class GroupCommitWriter:
+    """Single background writer that batches inserts into one transaction.
+
+    Callers await insert() and get their own primary key back; concurrent
+    callers share one BEGIN/COMMIT (and one fsync) instead of one each.
+    """
+
+    def __init__(self, engine, model, prepare=None, after_insert=None,
+                 max_batch=GROUP_COMMIT_MAX_BATCH, max_delay=GROUP_COMMIT_MAX_DELAY):
+        self.engine = engine
+        self.model = model
+        # prepare(connection, rows) -> rows, dijalankan di transaksi yang sama sebelum insert
+        self.prepare = prepare
+        # after_insert(connection, rows, ids) menerima baris asli (sebelum prepare)
+        self.after_insert = after_insert
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = None
+        self._task = None
+        self._loop = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            # Task menyalin context pemanggil; mulai dari context kosong agar writer
+            # tidak mewarisi contextvars request pertama (mis. request_timings)
+            self._task = contextvars.Context().run(loop.create_task, self._run())
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def insert(self, values):
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((values, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Ambil juga yang sudah antre tanpa menunggu lagi
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _write(self, rows):
+        stmt = insert(self.model).returning(self.model.id, sort_by_parameter_order=True)
+        async with self.engine.begin() as conn:
+            values = rows
+            if self.prepare is not None:
+                values = await conn.run_sync(self.prepare, rows)
+            ids = [row[0] for row in await conn.execute(stmt, values)]
+            if self.after_insert is not None:
+                await conn.run_sync(self.after_insert, rows, ids)
+            return ids
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            pending = [(values, future) for values, future in batch if not future.cancelled()]
+            if not pending:
+                continue
+            try:
+                ids = await self._write([values for values, _ in pending])
+                for (_, future), new_id in zip(pending, ids):
+                    if not future.done():
+                        future.set_result(new_id)
+            except Exception:
+                # Satu baris bermasalah tidak boleh menggagalkan yang lain
+                for values, future in pending:
+                    try:
+                        new_id = (await self._write([values]))[0]
+                        if not future.done():
+                            future.set_result(new_id)
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
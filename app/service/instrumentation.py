@@ -0,0 +1,124 @@
+"""Application metrics exposed on GET /metrics (see app/utils/metrics.py)."""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.utils.metrics import SIZE_BUCKETS, counter, gauge, histogram
+
+http_requests = counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")
+)
+http_request_duration = histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")
+)
+
+# parse, extract_cfg, paths, unreachable, exec, trace
+stage_duration = histogram(
+    "analysis_stage_duration_seconds", "Duration of each analysis pipeline stage.", ("stage",)
+)
+
+cfg_nodes = histogram("analysis_cfg_nodes", "Nodes per analysed CFG.", buckets=SIZE_BUCKETS)
+cfg_edges = histogram("analysis_cfg_edges", "Edges per analysed CFG.", buckets=SIZE_BUCKETS)
+execution_paths = histogram("analysis_execution_paths", "Execution paths per analysed CFG.", buckets=SIZE_BUCKETS)
+
+# hit = tidak perlu dihitung/disimpan ulang: request yang ikut single-flight, blob yang sudah ada
+cache_requests = counter("cache_requests_total", "Cache lookups by cache and result.", ("cache", "result"))
+
+queue_depth = gauge("queue_depth", "Items waiting in each internal queue.", ("queue",))
+in_flight = gauge("analysis_in_flight", "Distinct analyses currently computing for /analyze/.")
+jobs_running = gauge("analysis_jobs_running", "Analysis jobs currently claimed by a worker.")
+
+db_query_duration = histogram(
+    "db_query_duration_seconds", "SQLite statement latency by engine and statement kind.", ("engine", "statement")
+)
+
+
+# Durasi per tahap untuk request yang sedang berjalan (header Server-Timing);
+# None di luar request, mis. di worker job
+request_timings = ContextVar("request_timings", default=None)
+
+
+def add_request_timing(name, seconds):
+    timings = request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name):
+    """Time one pipeline stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def observe_stage(name, seconds):
+    stage_duration.labels(name).observe(seconds)
+    add_request_timing(name, seconds)
+
+
+def observe_graph(cfg):
+    cfg_nodes.observe(len(cfg["nodes"]))
+    cfg_edges.observe(len(cfg["edges"]))
+    execution_paths.observe(len(cfg["execution_paths"]))
+
+
+def observe_cache(cache, hits, misses):
+    if hits:
+        cache_requests.labels(cache, "hit").inc(hits)
+    if misses:
+        cache_requests.labels(cache, "miss").inc(misses)
+
+
+def _route_template(scope):
+    route = scope.get("route")
+    # Path mentah dari request tanpa route tidak dipakai: kardinalitas label tak terbatas
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware (no BaseHTTPMiddleware, so streaming stays untouched)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = _route_template(scope)
+            http_request_duration.labels(scope["method"], route).observe(time.perf_counter() - start)
+            http_requests.labels(scope["method"], route, status[0]).inc()
+
+
+STATEMENT_KINDS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+def instrument_engine(engine, name):
+    """Record the duration of every statement executed on a (sync) engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("query_start", time.perf_counter())
+        kind = statement.lstrip()[:6].upper()
+        db_query_duration.labels(name, kind if kind in STATEMENT_KINDS else "OTHER").observe(elapsed)
+        add_request_timing("db", elapsed)
@@ -0,0 +1,360 @@
+"""Durable analysis job queue on SQLite.
+
+POST /jobs/analyze only inserts a queued row into analysis_jobs. JobWorkers
+runs separate processes that claim jobs (an UPDATE guarded by status, so two
+workers never get the same row), write progress into the row while the
+analysis runs and store the result there.
+
+A claimed job is leased: its worker renews heartbeat_at while it runs. A job
+whose lease expired (worker killed, server stopped) is requeued by any worker,
+and failed once it used up JOB_MAX_ATTEMPTS. Every write of the worker is
+fenced by the attempt it claimed, so a worker that lost its lease cannot
+overwrite the new attempt. A job running longer than JOB_TIMEOUT fails.
+
+Workers start with the first job request of a server process (a2wsgi under
+Passenger sends no lifespan events) or run as their own service:
+
+    python -m app.service.job_queue [--workers 2]
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from sqlalchemy import create_engine, event, func, select, update
+from sqlalchemy.orm import undefer
+
+from app.database import BUSY_TIMEOUT_MS, set_sqlite_pragmas
+from app.model.models import AnalysisJob
+from app.service.admission import check_job_cost
+from app.service.analysis import analyze_source
+from app.service.cfg_builder import set_parallel_build
+from app.service.cost_model import estimate_cost
+from app.utils.cancellation import Cancelled
+from app.utils.serialization import dumps_json
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL_MS", 200)) / 1000
+# Progres ditulis ke database paling sering sekali per interval ini
+JOB_PROGRESS_INTERVAL = float(os.environ.get("JOB_PROGRESS_INTERVAL_MS", 250)) / 1000
+# Interval polling stream SSE dan jeda komentar keep-alive untuk proxy
+JOB_EVENT_INTERVAL = float(os.environ.get("JOB_EVENT_INTERVAL_MS", 250)) / 1000
+JOB_KEEPALIVE_INTERVAL = 15.0
+# Lease job yang sedang jalan; diperbarui tiap sepertiganya oleh worker
+JOB_LEASE = float(os.environ.get("JOB_LEASE_S", 60))
+JOB_HEARTBEAT_INTERVAL = JOB_LEASE / 3
+JOB_TIMEOUT = float(os.environ.get("JOB_TIMEOUT_S", 300))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+# build_cfg tidak punya checkpoint: worker yang tidak berhenti setelah ini dimatikan
+JOB_KILL_GRACE = 5.0
+JOB_SUPERVISE_INTERVAL = float(os.environ.get("JOB_SUPERVISE_INTERVAL_S", 5))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+
+async def enqueue_job(db, source):
+    job = AnalysisJob(source_code=source)
+    db.add(job)
+    await db.commit()
+    return job
+
+
+def _utcnow():
+    return datetime.datetime.utcnow()
+
+
+def claim_job(connection):
+    """Mark the oldest queued job running and return (id, source_code, attempts), or None."""
+    oldest = (
+        select(AnalysisJob.id)
+        .where(AnalysisJob.status == QUEUED)
+        .order_by(AnalysisJob.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(AnalysisJob)
+        .where(AnalysisJob.id == oldest, AnalysisJob.status == QUEUED)
+        .values(
+            status=RUNNING,
+            started_at=_utcnow(),
+            heartbeat_at=_utcnow(),
+            attempts=AnalysisJob.attempts + 1,
+        )
+        .returning(AnalysisJob.id, AnalysisJob.source_code, AnalysisJob.attempts)
+    )
+    return connection.execute(stmt).first()
+
+
+def count_jobs(engine, status):
+    with engine.connect() as connection:
+        return connection.scalar(
+            select(func.count()).select_from(AnalysisJob).where(AnalysisJob.status == status)
+        )
+
+
+def requeue_expired_jobs(connection, now=None):
+    """Requeue running jobs whose lease expired; fail those out of attempts."""
+    now = now or _utcnow()
+    # Baris dari sebelum heartbeat_at ada memakai started_at
+    expired = (
+        AnalysisJob.status == RUNNING,
+        func.coalesce(AnalysisJob.heartbeat_at, AnalysisJob.started_at)
+        < now - datetime.timedelta(seconds=JOB_LEASE),
+    )
+    connection.execute(
+        update(AnalysisJob)
+        .where(*expired, AnalysisJob.attempts >= JOB_MAX_ATTEMPTS)
+        .values(status=FAILED, finished_at=now,
+                error=f"The worker stopped during all {JOB_MAX_ATTEMPTS} attempts.")
+    )
+    connection.execute(
+        update(AnalysisJob).where(*expired).values(status=QUEUED, nodes_built=0, paths_enumerated=0)
+    )
+
+
+def _lease_writer(engine, job_id, attempt):
+    """Update the job row only while this attempt still holds it; returns whether it did."""
+    owned = (AnalysisJob.id == job_id, AnalysisJob.status == RUNNING, AnalysisJob.attempts == attempt)
+
+    def write(**values):
+        with engine.begin() as connection:
+            return connection.execute(update(AnalysisJob).where(*owned).values(**values)).rowcount > 0
+
+    return write
+
+
+def _watch(write, done, cancelled):
+    """Heartbeat thread of one job: renews the lease and enforces JOB_TIMEOUT."""
+    deadline = time.monotonic() + JOB_TIMEOUT
+    while not done.wait(max(0.0, min(JOB_HEARTBEAT_INTERVAL, deadline - time.monotonic()))):
+        if time.monotonic() >= deadline:
+            write(status=FAILED, error=f"Analysis exceeded the {JOB_TIMEOUT:g}s job timeout.",
+                  finished_at=_utcnow())
+            cancelled.set()
+            if not done.wait(JOB_KILL_GRACE):
+                # Supervisor menjalankan worker pengganti
+                os._exit(1)
+            return
+        if not write(heartbeat_at=_utcnow()):
+            # Lease sudah hilang (job di-requeue); jangan lanjutkan pekerjaan yang sia-sia
+            cancelled.set()
+            return
+
+
+def run_job(engine, job_id, source, attempt):
+    write = _lease_writer(engine, job_id, attempt)
+    last_write = [0.0]
+
+    def progress(nodes_built, paths_enumerated):
+        now = time.monotonic()
+        if now - last_write[0] < JOB_PROGRESS_INTERVAL:
+            return
+        last_write[0] = now
+        write(nodes_built=nodes_built, paths_enumerated=paths_enumerated)
+
+    done = threading.Event()
+    cancelled = threading.Event()
+    watcher = threading.Thread(target=_watch, args=(write, done, cancelled), name="job-heartbeat", daemon=True)
+    watcher.start()
+    try:
+        # Job diterima hanya berdasarkan AST-nya; batas jumlah path dicek di sini, CFG-nya dipakai ulang
+        estimate = estimate_cost(source, cancelled)
+        check_job_cost(estimate)
+        result = analyze_source(source, progress, cancelled, estimate["cfg"] if estimate else None)
+    except Cancelled:
+        # Status sudah ditulis oleh watcher (timeout) atau oleh pemilik lease yang baru
+        return
+    except Exception as e:
+        write(status=FAILED, error=str(e), finished_at=_utcnow())
+        return
+    finally:
+        done.set()
+        watcher.join()
+
+    if result is None:
+        write(status=FAILED, error="Unable to process the code.", finished_at=_utcnow())
+        return
+    write(
+        status=DONE,
+        result=result,
+        nodes_built=result["nodes_count"],
+        paths_enumerated=len(result["execution_paths"]),
+        finished_at=_utcnow(),
+    )
+
+
+def worker_main(database_url, parent_pid):
+    """Entry point of one worker process; SIGTERM stops it after the current job."""
+    # Bukan multiprocessing.Event: worker yang mati saat menunggunya membuat set() macet
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    # Thread heartbeat menulis lewat engine yang sama
+    engine = create_engine(
+        database_url, connect_args={"check_same_thread": False, "timeout": BUSY_TIMEOUT_MS / 1000}
+    )
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    # Paralelisme antar job sudah ada; pool CFG per worker hanya melipatgandakan proses
+    set_parallel_build(False)
+    last_requeue = 0.0
+    try:
+        # Berhenti juga jika proses server mati tanpa sempat memanggil stop()
+        while not stop_event.is_set() and os.getppid() == parent_pid:
+            with engine.begin() as connection:
+                if time.monotonic() - last_requeue >= JOB_HEARTBEAT_INTERVAL:
+                    requeue_expired_jobs(connection)
+                    last_requeue = time.monotonic()
+                job = claim_job(connection)
+            if job is None:
+                stop_event.wait(JOB_POLL_INTERVAL)
+                continue
+            run_job(engine, job.id, job.source_code, job.attempts)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.dispose()
+
+
+class JobWorkers:
+    """Worker processes of one server process, respawned by a supervisor thread when they die."""
+
+    def __init__(self, engine, workers=JOB_WORKERS):
+        self.engine = engine
+        self.workers = workers
+        # spawn: jangan mewarisi event loop dan koneksi SQLite milik server
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._owner = None
+        self._stop = threading.Event()
+        self._processes = []
+        self._supervisor = None
+
+    def start(self):
+        """Start the workers unless they already run in this process; safe to call on every request."""
+        if self.workers <= 0 or (self._owner == os.getpid() and self._processes):
+            return
+        with self._lock:
+            if self._owner == os.getpid() and self._processes:
+                return
+            # Setelah fork, proses dan thread milik induk bukan milik kita
+            self._owner = os.getpid()
+            self._stop = threading.Event()
+            self._processes = [self._spawn() for _ in range(self.workers)]
+            self._supervisor = threading.Thread(target=self._supervise, name="job-supervisor", daemon=True)
+            self._supervisor.start()
+
+    def _spawn(self):
+        url = self.engine.url.render_as_string(hide_password=False)
+        process = self._context.Process(
+            target=worker_main, args=(url, os.getpid()), name="analysis-job-worker"
+        )
+        process.start()
+        return process
+
+    def _supervise(self):
+        stop = self._stop
+        while not stop.wait(JOB_SUPERVISE_INTERVAL):
+            with self._lock:
+                if stop.is_set():
+                    return
+                for i, process in enumerate(self._processes):
+                    if process.is_alive():
+                        continue
+                    process.join()
+                    logger.warning("Job worker %s exited with %s; starting a new one", process.pid, process.exitcode)
+                    self._processes[i] = self._spawn()
+
+    def stop(self, timeout=5.0):
+        with self._lock:
+            if self._owner != os.getpid() or not self._processes:
+                return
+            self._stop.set()
+            processes, self._processes = self._processes, []
+        self._supervisor.join()
+        for process in processes:
+            process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                # Lease job yang terputus habis, lalu job di-requeue oleh worker lain
+                process.kill()
+                process.join()
+
+
+def job_state(job, include_result=False):
+    state = {
+        "job_id": job.id,
+        "status": job.status,
+        "progress": {
+            "nodes_built": job.nodes_built,
+            "paths_enumerated": job.paths_enumerated,
+        },
+        "error": job.error,
+        "created_at": str(job.created_at),
+        "started_at": str(job.started_at) if job.started_at else None,
+        "finished_at": str(job.finished_at) if job.finished_at else None,
+    }
+    if include_result:
+        state["result"] = job.result
+    return state
+
+
+async def iter_job_events(session_factory, job_id):
+    """Server-Sent Events: a 'progress' event on every change, then 'done' or 'failed' with the result."""
+    last = None
+    idle_since = time.monotonic()
+    while True:
+        async with session_factory() as db:
+            job = await db.get(AnalysisJob, job_id, options=[undefer(AnalysisJob.result)])
+        if job is None:
+            return
+        finished = job.status in FINISHED
+        state = job_state(job, include_result=finished)
+        if state != last:
+            name = job.status if finished else "progress"
+            yield b"event: " + name.encode() + b"\ndata: " + dumps_json(state) + b"\n\n"
+            last = state
+            idle_since = time.monotonic()
+        elif time.monotonic() - idle_since >= JOB_KEEPALIVE_INTERVAL:
+            yield b": keep-alive\n\n"
+            idle_since = time.monotonic()
+        if finished:
+            return
+        await asyncio.sleep(JOB_EVENT_INTERVAL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the analysis job workers as their own service.")
+    parser.add_argument("--workers", type=int, default=max(JOB_WORKERS, 1))
+    args = parser.parse_args()
+
+    # Diimpor lewat nama modul: target proses worker harus bisa di-pickle oleh spawn
+    from app.database import engine
+    from app.service import job_queue
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    workers = job_queue.JobWorkers(engine, args.workers)
+    workers.start()
+    try:
+        stopping.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        workers.stop()
+
+
+if __name__ == "__main__":
+    main()
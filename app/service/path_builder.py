@@ -1,4 +1,9 @@
-def generate_execution_paths(cfg):
+from app.utils.cancellation import checkpoint
+
+
+def generate_execution_paths(cfg, on_path=None, cancelled=None):
+    """Enumerate start-to-end paths. on_path(n) is called each time the n-th path is found;
+    setting the cancelled event stops the enumeration with Cancelled."""
     if not cfg or isinstance(cfg, dict) and "message" in cfg:
         return []
     
@@ -43,8 +48,13 @@ def generate_execution_paths(cfg):
         if node["data"]["label"] == "End":
             end_nodes.add(node["id"])
     
+    found = 0
+
     # Use DFS to find all paths from start to end nodes
     def dfs_paths(current, end_nodes, path=None, path_labels=None, visited=None):
+        nonlocal found
+        # Titik henti kooperatif: enumerasi bisa eksponensial, cek tiap node dikunjungi
+        checkpoint(cancelled)
         if path is None:
             path = []
         if path_labels is None:
@@ -58,6 +68,9 @@ def generate_execution_paths(cfg):
         
         # If we reached an end node, return this path
         if current in end_nodes:
+            if on_path is not None:
+                found += 1
+                on_path(found)
             # Convert node IDs to line numbers
             line_path = []
             for node_id in path:
@@ -0,0 +1,120 @@
+"""Server-Timing header on every response and admin-only ?profile=1.
+
+ServerTimingMiddleware gives each request a fresh timings dict (see
+instrumentation.request_timings) that the pipeline stages and DB queries add
+to, and writes it into the Server-Timing header, which browser devtools show
+per request.
+
+With ?profile=1 and a valid X-Admin-Token, ProfileMiddleware runs the request
+under the sampling profiler and answers with the profile instead of the
+normal body. It samples every thread in the process, so concurrent requests
+show up too.
+"""
+import hmac
+import os
+import time
+from urllib.parse import parse_qs
+
+from app.service.instrumentation import request_timings
+from app.utils.sampling_profiler import SamplingProfiler
+from app.utils.serialization import dumps_json
+
+# Profiling mati jika token admin tidak diset
+PROFILE_ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN")
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", 1)) / 1000
+PROFILE_TOP = int(os.environ.get("PROFILE_TOP", 20))
+
+# Nama metrik di header; tahap yang tidak ada di sini memakai namanya sendiri
+SERVER_TIMING_NAMES = {"extract_cfg": "cfg"}
+
+
+def server_timing_header(timings, total):
+    parts = [
+        f"{SERVER_TIMING_NAMES.get(name, name)};dur={seconds * 1000:.3f}"
+        for name, seconds in timings.items()
+    ]
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        timings = {}
+        token = request_timings.set(timings)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header = server_timing_header(timings, time.perf_counter() - start)
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+
+
+def _wants_profile(scope):
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", ["0"])[-1] in ("1", "true")
+
+
+def _authorized(scope):
+    if not PROFILE_ADMIN_TOKEN:
+        return False
+    for name, value in scope.get("headers", []):
+        if name == b"x-admin-token":
+            return hmac.compare_digest(value.decode("latin-1"), PROFILE_ADMIN_TOKEN)
+    return False
+
+
+async def _send_json(send, status, data):
+    body = dumps_json(data)
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class ProfileMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _authorized(scope):
+            await _send_json(send, 403, {"detail": "Profiling requires a valid X-Admin-Token."})
+            return
+
+        response = {"status_code": None, "server_timing": None, "body_bytes": 0}
+
+        async def capture(message):
+            # Respons asli tidak dikirim; yang dikirim adalah hasil profil
+            if message["type"] == "http.response.start":
+                response["status_code"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name == b"server-timing":
+                        response["server_timing"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response["body_bytes"] += len(message.get("body", b""))
+
+        profiler = SamplingProfiler(PROFILE_SAMPLE_INTERVAL).start()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            profiler.stop()
+        await _send_json(send, 200, {"response": response, "profile": profiler.report(PROFILE_TOP)})
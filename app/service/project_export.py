@@ -0,0 +1,88 @@
+import zlib
+
+from sqlalchemy.orm import undefer_group
+
+from app.model.models import Code, Project
+from app.service.blob_store import BLOB_LOAD_OPTIONS
+from app.utils.serialization import dumps_json
+
+# Jumlah baris Code yang diambil per round-trip saat streaming
+EXPORT_BATCH_SIZE = 100
+
+
+def export_project_record(project):
+    return {
+        "id": project.id,
+        "name": project.name,
+        "description": project.description,
+        "created_at": str(project.created_at),
+    }
+
+
+def export_code_record(code):
+    return {
+        "id": code.id,
+        "name": code.name,
+        "source_code": code.source,
+        "path_list": code.path_list or [],
+        "coverage_path": code.coverage_path,
+        "cyclomatic_complexity": code.cyclomatic_complexity,
+        "test_cases": code.test_cases or [],
+        "nodes_list": code.nodes or [],
+        "edges_list": code.edges or [],
+        "created_at": str(code.created_at)
+    }
+
+
+def _iter_codes(db, project_id):
+    query = (
+        db.query(Code)
+        .filter(Code.project_id == project_id)
+        .options(undefer_group("payload"), *BLOB_LOAD_OPTIONS)
+        .order_by(Code.id)
+        .yield_per(EXPORT_BATCH_SIZE)
+    )
+    for code in query:
+        yield export_code_record(code)
+
+
+def iter_export_ndjson(session_factory, project_id):
+    """One JSON document per line: the project first, then each code."""
+    db = session_factory()
+    try:
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            return
+        yield dumps_json({"type": "project", **export_project_record(project)}) + b"\n"
+        for record in _iter_codes(db, project_id):
+            yield dumps_json({"type": "code", **record}) + b"\n"
+    finally:
+        db.close()
+
+
+def iter_export_json(session_factory, project_id):
+    """Same document as the regular export, written one code at a time."""
+    db = session_factory()
+    try:
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            return
+        header = dumps_json({"project": {**export_project_record(project), "codes": []}})
+        # Potong tepat sebelum "[]}}" supaya array codes bisa diisi bertahap
+        yield header[:-4] + b"["
+        separator = b""
+        for record in _iter_codes(db, project_id):
+            yield separator + dumps_json(record)
+            separator = b","
+        yield b"]}}"
+    finally:
+        db.close()
+
+
+def gzip_stream(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
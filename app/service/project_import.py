@@ -0,0 +1,184 @@
+import datetime
+import json
+import tempfile
+import zlib
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from starlette.concurrency import run_in_threadpool
+
+from app.model.models import Code, Project
+from app.model.request_model import ImportCodeRecord, ImportProjectRecord
+from app.service.blob_store import dedupe_payloads
+from app.service.code_index import index_new_codes
+from app.utils.serialization import dumps_json
+
+# Jumlah baris Code per executemany
+IMPORT_BATCH_SIZE = 2000
+
+RECORD_MODELS = {"project": ImportProjectRecord, "code": ImportCodeRecord}
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+async def iter_ndjson(chunks, gzipped=False):
+    """Yield one parsed record per line as the body arrives."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    buffer = b""
+    async for chunk in chunks:
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if decompressor:
+        buffer += decompressor.flush()
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+
+def _parse_line(line):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise ImportFormatError(f"Invalid NDJSON line: {e}")
+
+
+async def iter_export_document(chunks, gzipped=False):
+    """Turn a regular export document into the same records as the NDJSON export."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    parts = []
+    async for chunk in chunks:
+        parts.append(decompressor.decompress(chunk) if decompressor else chunk)
+    if decompressor:
+        parts.append(decompressor.flush())
+    try:
+        # Dokumen besar: parsing di thread agar event loop tetap melayani request lain
+        document = await run_in_threadpool(json.loads, b"".join(parts))
+    except ValueError as e:
+        raise ImportFormatError(f"Invalid JSON document: {e}")
+
+    project = document.get("project") if isinstance(document, dict) else None
+    if not isinstance(project, dict):
+        raise ImportFormatError("Document has no 'project' object.")
+    codes = project.pop("codes", None) or []
+    yield {"type": "project", **project}
+    for code in codes:
+        yield {"type": "code", **code}
+
+
+def _parse_datetime(value):
+    if not value:
+        return datetime.datetime.utcnow()
+    try:
+        return datetime.datetime.fromisoformat(str(value))
+    except ValueError:
+        return datetime.datetime.utcnow()
+
+
+def validate_record(record, number):
+    """(type, fields) of one record; ImportFormatError names the record that is wrong."""
+    if not isinstance(record, dict):
+        raise ImportFormatError(f"Record {number}: expected a JSON object.")
+    kind = record.get("type")
+    model = RECORD_MODELS.get(kind)
+    if model is None:
+        raise ImportFormatError(f"Record {number}: unknown record type: {kind!r}")
+    try:
+        return kind, model.model_validate(record).model_dump()
+    except ValidationError as e:
+        error = e.errors()[0]
+        field = ".".join(str(part) for part in error["loc"])
+        raise ImportFormatError(f"Record {number} ({kind}): {field}: {error['msg']}")
+
+
+def code_row(record, project_id):
+    return {
+        "name": record["name"],
+        "source_code": record["source_code"],
+        "project_id": project_id,
+        "path_list": record["path_list"] or [],
+        "coverage_path": record["coverage_path"],
+        "cyclomatic_complexity": record["cyclomatic_complexity"],
+        "test_cases": record["test_cases"] or [],
+        "nodes_list": record["nodes_list"] or [],
+        "edges_list": record["edges_list"] or [],
+        "created_at": _parse_datetime(record["created_at"]),
+    }
+
+
+def insert_project(db, record):
+    project = Project(
+        name=record["name"],
+        description=record["description"] or "",
+        created_at=_parse_datetime(record["created_at"]),
+    )
+    db.add(project)
+    db.flush()
+    return project.id, project.name
+
+
+def insert_codes(db, rows):
+    if not rows:
+        return
+    connection = db.connection()
+    stmt = insert(Code).returning(Code.id, sort_by_parameter_order=True)
+    ids = list(db.scalars(stmt, dedupe_payloads(connection, rows)))
+    index_new_codes(connection, rows, ids)
+
+
+def insert_spooled(db, spool, batch_size=IMPORT_BATCH_SIZE):
+    """Insert the validated records of spool in one transaction; nothing is kept if any insert fails."""
+    projects = []
+    project_id = None
+    batch = []
+    codes = 0
+    try:
+        for line in spool:
+            kind, record = json.loads(line)
+            if kind == "project":
+                insert_codes(db, batch)
+                batch.clear()
+                project_id, name = insert_project(db, record)
+                projects.append({"old_id": record["id"], "new_id": project_id, "name": name})
+                continue
+            batch.append(code_row(record, project_id))
+            codes += 1
+            if len(batch) >= batch_size:
+                insert_codes(db, batch)
+                batch.clear()
+        insert_codes(db, batch)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"projects": projects, "codes_imported": codes}
+
+
+async def import_records(db, records, batch_size=IMPORT_BATCH_SIZE):
+    """Validate a record stream, then insert all of it in one transaction.
+
+    Every "project" record creates a new project; the "code" records after it
+    are attached to that project. Returns the old -> new project id mapping.
+    Records are validated while the body arrives and spooled to a temporary
+    file, so an invalid record fails the import before anything is written
+    and the SQLite write lock is not held while a slow client uploads. db is a
+    sync Session; the inserts run in the threadpool.
+    """
+    with tempfile.TemporaryFile() as spool:
+        has_project = False
+        number = 0
+        async for record in records:
+            number += 1
+            kind, fields = validate_record(record, number)
+            if kind == "code" and not has_project:
+                raise ImportFormatError("Code record before any project record.")
+            has_project = has_project or kind == "project"
+            spool.write(dumps_json([kind, fields]) + b"\n")
+        spool.seek(0)
+        return await run_in_threadpool(insert_spooled, db, spool, batch_size)
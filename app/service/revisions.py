@@ -0,0 +1,202 @@
+"""Revision history of saved analyses.
+
+The codes row is always the head (latest revision), so export, search and
+stats keep working unchanged. code_revisions stores the history: a full
+snapshot on revision 1 and every SNAPSHOT_INTERVAL revisions, and a delta
+against the previous revision otherwise. Reconstructing any revision reads
+at most SNAPSHOT_INTERVAL rows.
+
+All functions take a sync Session; async endpoints call them via run_sync.
+"""
+import os
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import undefer_group
+
+from app.model.models import Code, CodeRevision
+from app.service.blob_store import BLOB_LOAD_OPTIONS, dedupe_payloads
+from app.service.code_index import reindex_code
+from app.utils.delta import apply_items, apply_lines, diff_items, diff_lines
+
+SNAPSHOT_INTERVAL = int(os.environ.get("REVISION_SNAPSHOT_INTERVAL", 10))
+
+METADATA_FIELDS = ("name", "coverage_path", "cyclomatic_complexity", "path_list", "test_cases")
+
+
+def _head_state(code):
+    return {
+        "name": code.name,
+        "source_code": code.source,
+        "path_list": code.path_list or [],
+        "coverage_path": code.coverage_path,
+        "cyclomatic_complexity": code.cyclomatic_complexity,
+        "test_cases": code.test_cases or [],
+        "nodes_list": code.nodes or [],
+        "edges_list": code.edges or [],
+    }
+
+
+def _load_head(db, code_id):
+    return (
+        db.query(Code)
+        .options(undefer_group("payload"), *BLOB_LOAD_OPTIONS)
+        .filter(Code.id == code_id)
+        .first()
+    )
+
+
+def _revision_row(code_id, revision, state, previous=None, created_at=None):
+    row = CodeRevision(code_id=code_id, revision=revision, created_at=created_at)
+    for field in METADATA_FIELDS:
+        setattr(row, field, state[field])
+    row.is_snapshot = previous is None or (revision - 1) % SNAPSHOT_INTERVAL == 0
+    if row.is_snapshot:
+        row.source = state["source_code"]
+        row.nodes = state["nodes_list"]
+        row.edges = state["edges_list"]
+    else:
+        row.source = diff_lines(previous["source_code"], state["source_code"])
+        row.nodes = diff_items(previous["nodes_list"], state["nodes_list"])
+        row.edges = diff_items(previous["edges_list"], state["edges_list"])
+    return row
+
+
+def is_revision_conflict(error):
+    """True if an IntegrityError is the unique (code_id, revision) constraint, i.e. a concurrent append."""
+    # SQLite tidak melaporkan nama constraint, hanya kolomnya
+    return "UNIQUE constraint failed: code_revisions.code_id, code_revisions.revision" in str(error.orig)
+
+
+def _lock_code(db, code_id, project_id=None):
+    """Take SQLite's write lock before reading the head; False if the code is missing.
+
+    Two concurrent appends would otherwise read the same head and revision number:
+    the second would fail on the unique constraint, or store a delta against a
+    stale head. A no-op UPDATE (name touches no trigger) makes the second
+    transaction wait for the first to commit and then read its result.
+    """
+    stmt = update(Code).where(Code.id == code_id).values(name=Code.name)
+    if project_id is not None:
+        stmt = stmt.where(Code.project_id == project_id)
+    return db.execute(stmt, execution_options={"synchronize_session": False}).rowcount > 0
+
+
+def append_revision(db, code_id, values, project_id=None):
+    """Record values as the next revision of code_id and make it the head.
+
+    A code without history is at revision 1; its current content becomes the
+    first snapshot. Returns the new revision number, or None if the code is
+    missing (or not in project_id, when given).
+    """
+    if not _lock_code(db, code_id, project_id):
+        return None
+    code = _load_head(db, code_id)
+    if code is None:
+        return None
+    head = _head_state(code)
+
+    latest = db.query(func.max(CodeRevision.revision)).filter(CodeRevision.code_id == code_id).scalar()
+    if latest is None:
+        db.add(_revision_row(code_id, 1, head, created_at=code.created_at))
+        latest = 1
+    revision = latest + 1
+    db.add(_revision_row(code_id, revision, values, previous=head))
+
+    connection = db.connection()
+    row = dedupe_payloads(connection, [values])[0]
+    # Head baru selalu lewat blob; kosongkan kolom inline peninggalan baris lama
+    row.update(source_code=None, nodes_list=None, edges_list=None)
+    db.execute(
+        update(Code).where(Code.id == code_id).values(**row),
+        execution_options={"synchronize_session": False},
+    )
+    reindex_code(connection, values, code_id)
+    return revision
+
+
+def list_revisions(db, code_id):
+    rows = (
+        db.query(CodeRevision)
+        .filter(CodeRevision.code_id == code_id)
+        .order_by(CodeRevision.revision)
+        .all()
+    )
+    if rows:
+        return [
+            {
+                "revision": row.revision,
+                "name": row.name,
+                "coverage_path": row.coverage_path,
+                "cyclomatic_complexity": row.cyclomatic_complexity,
+                "is_snapshot": row.is_snapshot,
+                "created_at": str(row.created_at),
+            }
+            for row in rows
+        ]
+    code = db.get(Code, code_id)
+    if code is None:
+        return None
+    return [{
+        "revision": 1,
+        "name": code.name,
+        "coverage_path": code.coverage_path,
+        "cyclomatic_complexity": code.cyclomatic_complexity,
+        "is_snapshot": True,
+        "created_at": str(code.created_at),
+    }]
+
+
+def get_revision(db, code_id, revision):
+    """Full content of one revision, rebuilt from the nearest snapshot before it."""
+    base = (
+        db.query(func.max(CodeRevision.revision))
+        .filter(
+            CodeRevision.code_id == code_id,
+            CodeRevision.is_snapshot.is_(True),
+            CodeRevision.revision <= revision,
+        )
+        .scalar()
+    )
+    if base is None:
+        if revision != 1:
+            return None
+        # Belum ada history: revisi 1 adalah head
+        code = _load_head(db, code_id)
+        if code is None:
+            return None
+        has_history = db.query(CodeRevision.id).filter(CodeRevision.code_id == code_id).first()
+        if has_history:
+            return None
+        return {"code_id": code_id, "revision": 1, **_head_state(code), "created_at": str(code.created_at)}
+
+    rows = (
+        db.query(CodeRevision)
+        .options(undefer_group("payload"))
+        .filter(
+            CodeRevision.code_id == code_id,
+            CodeRevision.revision >= base,
+            CodeRevision.revision <= revision,
+        )
+        .order_by(CodeRevision.revision)
+        .all()
+    )
+    if rows[-1].revision != revision:
+        return None
+
+    source, nodes, edges = rows[0].source, rows[0].nodes, rows[0].edges
+    for row in rows[1:]:
+        source = apply_lines(source, row.source)
+        nodes = apply_items(nodes, row.nodes)
+        edges = apply_items(edges, row.edges)
+
+    last = rows[-1]
+    state = {field: getattr(last, field) for field in METADATA_FIELDS}
+    return {
+        "code_id": code_id,
+        "revision": revision,
+        **state,
+        "source_code": source,
+        "nodes_list": nodes,
+        "edges_list": edges,
+        "created_at": str(last.created_at),
+    }
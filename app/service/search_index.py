@@ -0,0 +1,137 @@
+"""Full-text index (SQLite FTS5) over saved analyses.
+
+codes_fts is an external-content table over the codes_search view (rowid =
+codes.id): it stores only the token index, and snippet() reads the name,
+source and node statements back through the view, which decodes the stored
+blobs with the SQL functions from app/utils/sql_functions.py. Triggers on
+codes keep the index in step with inserts, deletes and content updates.
+
+(SQLite here is older than 3.43, so a contentless table with
+contentless_delete=1 is not available.)
+"""
+from sqlalchemy import DateTime, Float, Integer, String, text
+from sqlalchemy.exc import OperationalError
+
+SEARCH_VIEW_DDL = """
+    CREATE VIEW IF NOT EXISTS codes_search AS
+    SELECT c.id AS id,
+           COALESCE(c.name, '') AS name,
+           payload_text(COALESCE(sb.data, c.source_code)) AS source_code,
+           payload_labels(COALESCE(nb.data, c.nodes_list)) AS labels
+    FROM codes c
+    LEFT JOIN blobs sb ON sb.hash = c.source_hash
+    LEFT JOIN blobs nb ON nb.hash = c.nodes_hash
+"""
+
+SEARCH_TABLE_DDL = """
+    CREATE VIRTUAL TABLE codes_fts USING fts5(
+        name, source_code, labels, content='codes_search', content_rowid='id'
+    )
+"""
+
+# Kolom codes yang menentukan isi indeks; UPDATE lain (mis. lock revisi) dilewati
+_CONTENT_CHANGED = " OR ".join(
+    f"OLD.{column} IS NOT NEW.{column}"
+    for column in ("name", "source_code", "source_hash", "nodes_list", "nodes_hash")
+)
+
+_INDEX_ROW = """
+    INSERT INTO codes_fts (rowid, name, source_code, labels)
+    SELECT id, name, source_code, labels FROM codes_search WHERE id = NEW.id;
+"""
+
+# External content: 'delete' harus menerima nilai yang persis sama dengan saat
+# diindeks, jadi dibaca dari view sebelum baris/blob lama hilang (BEFORE)
+_UNINDEX_ROW = """
+    INSERT INTO codes_fts (codes_fts, rowid, name, source_code, labels)
+    SELECT 'delete', id, name, source_code, labels FROM codes_search WHERE id = OLD.id;
+"""
+
+SEARCH_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS codes_fts_insert AFTER INSERT ON codes BEGIN
+        {_INDEX_ROW}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS codes_fts_delete BEFORE DELETE ON codes BEGIN
+        {_UNINDEX_ROW}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS codes_fts_update_old BEFORE UPDATE ON codes
+    WHEN {_CONTENT_CHANGED} BEGIN
+        {_UNINDEX_ROW}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS codes_fts_update AFTER UPDATE ON codes
+    WHEN {_CONTENT_CHANGED} BEGIN
+        {_INDEX_ROW}
+    END
+    """,
+)
+
+# Bobot bm25 per kolom: nama analisis paling relevan, lalu label node, lalu source
+BM25_WEIGHTS = "10.0, 1.0, 2.0"
+
+# None sampai ensure_search_index dijalankan; False jika SQLite tanpa FTS5
+search_enabled = None
+
+
+def _drop_search_index(connection):
+    """Drop the index and its triggers (also the pre-external-content layout)."""
+    for name in ("codes_fts_insert", "codes_fts_delete", "codes_fts_update_old", "codes_fts_update"):
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    connection.exec_driver_sql("DROP TABLE IF EXISTS codes_fts")
+
+
+def ensure_search_index(connection):
+    """Create codes_fts (and rebuild it from codes) when missing. Safe to call on every start.
+
+    A codes_fts from before the external-content layout holds its own copy of
+    every source; it is dropped and rebuilt.
+    """
+    global search_enabled
+    connection.exec_driver_sql(SEARCH_VIEW_DDL)
+    existing = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'codes_fts'"
+    ).scalar()
+    if existing is not None and "content=" not in existing:
+        _drop_search_index(connection)
+        existing = None
+    if existing is None:
+        try:
+            connection.exec_driver_sql(SEARCH_TABLE_DDL)
+        except OperationalError:
+            # SQLite dikompilasi tanpa FTS5: fitur pencarian dimatikan
+            search_enabled = False
+            return
+    for ddl in SEARCH_TRIGGERS:
+        connection.exec_driver_sql(ddl)
+    search_enabled = True
+    if existing is None:
+        connection.exec_driver_sql("INSERT INTO codes_fts (codes_fts) VALUES ('rebuild')")
+
+
+def match_query(query):
+    """Quote every whitespace-separated term so user input never hits FTS5 syntax."""
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"' for term in terms if term)
+
+
+def search_statement(project_id=None):
+    project_filter = "AND c.project_id = :project_id" if project_id is not None else ""
+    return text(f"""
+        SELECT c.id AS code_id, c.project_id, c.name, c.created_at,
+               snippet(codes_fts, -1, '<b>', '</b>', '...', 16) AS snippet,
+               bm25(codes_fts, {BM25_WEIGHTS}) AS score
+        FROM codes_fts
+        JOIN codes c ON c.id = codes_fts.rowid
+        WHERE codes_fts MATCH :query {project_filter}
+        ORDER BY score
+        LIMIT :limit OFFSET :offset
+    """).columns(
+        code_id=Integer, project_id=Integer, name=String, created_at=DateTime,
+        snippet=String, score=Float
+    )
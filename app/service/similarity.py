@@ -0,0 +1,93 @@
+"""Near-duplicate lookup over structural CFG fingerprints.
+
+Each saved code gets a WL hash (identical structure) and a MinHash signature
+split into LSH bands. Similar codes are found by band-key index lookup and
+ranked by estimated Jaccard similarity, never by scanning stored graphs.
+"""
+from sqlalchemy import delete, insert, select
+
+from app.model.models import Code, CodeFingerprint, CodeLshBand
+from app.service.blob_store import iter_code_payloads
+from app.utils.fingerprint import (
+    estimate_similarity,
+    fingerprint_cfg,
+    pack_signature,
+    unpack_signature,
+)
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def index_fingerprints(connection, rows, ids):
+    """Store fingerprints of freshly inserted code rows (before blob dedupe)."""
+    fingerprints = []
+    bands = []
+    for row, code_id in zip(rows, ids):
+        nodes = row.get("nodes_list") or []
+        if not nodes:
+            continue
+        fp = fingerprint_cfg(nodes, row.get("edges_list") or [])
+        fingerprints.append({
+            "code_id": code_id,
+            "wl_hash": fp["wl_hash"],
+            "minhash": pack_signature(fp["minhash"]),
+        })
+        bands.extend({"band_key": key, "code_id": code_id} for key in set(fp["bands"]))
+    if fingerprints:
+        connection.execute(insert(CodeFingerprint), fingerprints)
+        connection.execute(insert(CodeLshBand), bands)
+
+
+def remove_fingerprints(connection, ids):
+    connection.execute(delete(CodeLshBand).where(CodeLshBand.code_id.in_(ids)))
+    connection.execute(delete(CodeFingerprint).where(CodeFingerprint.code_id.in_(ids)))
+
+
+def ensure_fingerprints(connection):
+    """Fingerprint codes saved before this index existed. Cheap when up to date."""
+    indexed = connection.execute(select(CodeFingerprint.code_id).limit(1)).first()
+    if indexed is not None:
+        return
+    batch = []
+    for code_id, _, _, nodes, edges in iter_code_payloads(connection):
+        batch.append(({"nodes_list": nodes, "edges_list": edges}, code_id))
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            index_fingerprints(connection, *zip(*batch))
+            batch = []
+    if batch:
+        index_fingerprints(connection, *zip(*batch))
+
+
+async def find_similar(db, code_id, min_similarity=0.5, limit=20):
+    """Codes structurally similar to code_id, best first. None if it has no fingerprint."""
+    target = await db.get(CodeFingerprint, code_id)
+    if target is None:
+        return None
+    target_sig = unpack_signature(target.minhash)
+
+    band_keys = select(CodeLshBand.band_key).where(CodeLshBand.code_id == code_id)
+    candidates = (
+        select(CodeLshBand.code_id)
+        .where(CodeLshBand.band_key.in_(band_keys), CodeLshBand.code_id != code_id)
+        .distinct()
+    )
+    rows = await db.execute(
+        select(Code.id, Code.project_id, Code.name, CodeFingerprint.wl_hash, CodeFingerprint.minhash)
+        .join(CodeFingerprint, CodeFingerprint.code_id == Code.id)
+        .where(Code.id.in_(candidates))
+    )
+
+    results = []
+    for row in rows:
+        identical = row.wl_hash == target.wl_hash
+        score = 1.0 if identical else estimate_similarity(target_sig, unpack_signature(row.minhash))
+        if score >= min_similarity:
+            results.append({
+                "code_id": row.id,
+                "project_id": row.project_id,
+                "name": row.name,
+                "similarity": round(score, 4),
+                "identical_structure": identical,
+            })
+    results.sort(key=lambda r: (-r["similarity"], r["code_id"]))
+    return results[:limit]
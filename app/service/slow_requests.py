@@ -0,0 +1,140 @@
+"""Capture slow requests to a rotating JSONL log for later replay.
+
+Every request slower than SLOW_REQUEST_MS is written as one JSON line with
+everything needed to send it again: method, path, query string, replayable
+headers and body, plus its status, duration and Server-Timing breakdown.
+benchmarks/replay.py feeds such files back into the app.
+
+Each server process writes and rotates its own file (SLOW_REQUEST_LOG with
+the pid before the extension, e.g. logs/slow_requests.1234.jsonl): rotation
+by one Passenger process would otherwise rename the file under the others.
+"""
+import base64
+import datetime
+import logging
+import os
+import time
+from logging.handlers import RotatingFileHandler
+
+from app.utils.serialization import dumps_json
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", 1000))
+SLOW_REQUEST_LOG = os.environ.get("SLOW_REQUEST_LOG", os.path.join(BASE_DIR, "logs", "slow_requests.jsonl"))
+SLOW_REQUEST_LOG_BYTES = int(os.environ.get("SLOW_REQUEST_LOG_BYTES", 50 * 1024 * 1024))
+SLOW_REQUEST_LOG_BACKUPS = int(os.environ.get("SLOW_REQUEST_LOG_BACKUPS", 5))
+# Body lebih besar dari ini tidak disimpan (record ditandai body_truncated)
+SLOW_REQUEST_MAX_BODY = int(os.environ.get("SLOW_REQUEST_MAX_BODY", 1024 * 1024))
+
+# Hanya header yang memengaruhi respons; token dan cookie tidak pernah ditulis
+REPLAY_HEADERS = (b"content-type", b"content-encoding", b"accept", b"accept-encoding")
+
+
+_logger_pid = None
+
+
+def process_log_path(path, pid=None):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+
+def _logger(path):
+    global _logger_pid
+    logger = logging.getLogger("testflow.slow_requests")
+    if _logger_pid != os.getpid():
+        # Handler yang diwarisi lewat fork menulis ke file proses induk
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+            handler.close()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = RotatingFileHandler(
+            process_log_path(path), maxBytes=SLOW_REQUEST_LOG_BYTES, backupCount=SLOW_REQUEST_LOG_BACKUPS,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        _logger_pid = os.getpid()
+    return logger
+
+
+def encode_body(body):
+    try:
+        return {"body": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_base64": base64.b64encode(body).decode("ascii")}
+
+
+def decode_body(record):
+    if "body_base64" in record:
+        return base64.b64decode(record["body_base64"])
+    return (record.get("body") or "").encode("utf-8")
+
+
+class SlowRequestMiddleware:
+    def __init__(self, app, threshold_ms=SLOW_REQUEST_MS, path=SLOW_REQUEST_LOG):
+        self.app = app
+        self.threshold = threshold_ms / 1000
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.threshold <= 0:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        chunks = []
+        size = [0]
+        response = {"status": None, "server_timing": None}
+
+        async def receive_and_keep():
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                size[0] += len(body)
+                if size[0] <= SLOW_REQUEST_MAX_BODY:
+                    chunks.append(body)
+            return message
+
+        async def send_and_watch(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name == b"server-timing":
+                        response["server_timing"] = value.decode("latin-1")
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_keep, send_and_watch)
+        finally:
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.threshold:
+                self._write(scope, b"".join(chunks), size[0], response, elapsed)
+
+    def _write(self, scope, body, size, response, elapsed):
+        route = getattr(scope.get("route"), "path", None)
+        record = {
+            "ts": datetime.datetime.utcnow().isoformat(),
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route,
+            "query_string": scope.get("query_string", b"").decode("latin-1"),
+            "headers": {
+                name.decode("latin-1"): value.decode("latin-1")
+                for name, value in scope.get("headers", [])
+                if name in REPLAY_HEADERS
+            },
+            "status": response["status"],
+            "duration_ms": round(elapsed * 1000, 3),
+            "server_timing": response["server_timing"],
+        }
+        if size > SLOW_REQUEST_MAX_BODY:
+            record["body_truncated"] = True
+        else:
+            record.update(encode_body(body))
+        try:
+            _logger(self.path).info(dumps_json(record).decode("utf-8"))
+        except OSError:
+            # Log yang tidak bisa ditulis tidak boleh menggagalkan request
+            pass
@@ -0,0 +1,67 @@
+"""Stop abandoned work when the HTTP client goes away.
+
+CPU-bound work runs in a thread with a threading.Event; long loops call
+checkpoint(cancelled) and bail out with Cancelled once it is set. The
+endpoint awaits the work through cancel_on_disconnect, which cancels it the
+moment the server reports http.disconnect.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+
+from fastapi import HTTPException
+
+# Kode status nginx untuk "client closed request"; tidak akan sampai ke klien
+CLIENT_CLOSED_REQUEST = 499
+
+
+class Cancelled(Exception):
+    """Raised at a checkpoint once the work has been cancelled."""
+
+
+def checkpoint(cancelled):
+    if cancelled is not None and cancelled.is_set():
+        raise Cancelled()
+
+
+async def run_cancellable(func, *args):
+    """Run func(*args, cancelled=event) in a thread; cancelling the caller sets the event."""
+    cancelled = threading.Event()
+    loop = asyncio.get_running_loop()
+    # run_in_executor tidak membawa contextvars ke thread; salin agar konteks request ikut
+    context = contextvars.copy_context()
+    try:
+        return await loop.run_in_executor(
+            None, functools.partial(context.run, func, *args, cancelled=cancelled)
+        )
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+
+
+async def _wait_disconnect(request):
+    # Body sudah dibaca FastAPI, jadi pesan berikutnya hanya datang saat koneksi putus
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(request, awaitable):
+    """Await awaitable, cancelling it as soon as the client disconnects."""
+    work = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_disconnect(request))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        work.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if not work.done():
+        work.cancel()
+        # Tunggu pembersihan (kill proses, set event) selesai sebelum menjawab
+        await asyncio.wait({work})
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client disconnected.")
+    return work.result()
@@ -0,0 +1,65 @@
+"""Compact deltas between two revisions of an analysis.
+
+Source code is diffed line by line; nodes and edges are diffed as lists of
+dicts keyed by their "id". Every delta can be applied to the old value to get
+the new one back exactly.
+"""
+import difflib
+
+
+def diff_lines(old, new):
+    """Opcodes [start, end, replacement_lines] against the old lines; equal runs are implied."""
+    old_lines = (old or "").splitlines(keepends=True)
+    new_lines = (new or "").splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            ops.append([i1, i2, new_lines[j1:j2]])
+    return {"ops": ops, "none": new is None}
+
+
+def apply_lines(old, delta):
+    if delta["none"]:
+        return None
+    old_lines = (old or "").splitlines(keepends=True)
+    out = []
+    pos = 0
+    for start, end, lines in delta["ops"]:
+        out.extend(old_lines[pos:start])
+        out.extend(lines)
+        pos = end
+    out.extend(old_lines[pos:])
+    return "".join(out)
+
+
+def _keyed(items):
+    if not isinstance(items, list):
+        return None
+    keyed = {}
+    for item in items:
+        if not isinstance(item, dict) or "id" not in item or item["id"] in keyed:
+            return None
+        keyed[item["id"]] = item
+    return keyed
+
+
+def diff_items(old, new):
+    """Changed/added items plus the new id order; falls back to the full list if ids are unusable."""
+    old_keyed = _keyed(old or [])
+    new_keyed = _keyed(new or [])
+    if old_keyed is None or new_keyed is None:
+        return {"full": new}
+    changed = [item for key, item in new_keyed.items() if old_keyed.get(key) != item]
+    order = list(new_keyed)
+    return {"changed": changed, "order": None if order == list(old_keyed) else order}
+
+
+def apply_items(old, delta):
+    if "full" in delta:
+        return delta["full"]
+    keyed = {item["id"]: item for item in old or []}
+    for item in delta["changed"]:
+        keyed[item["id"]] = item
+    order = delta["order"] if delta["order"] is not None else [item["id"] for item in old or []]
+    return [keyed[key] for key in order]
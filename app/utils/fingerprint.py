@@ -0,0 +1,113 @@
+import hashlib
+import struct
+
+# Weisfeiler-Lehman: jumlah iterasi relabel tetangga
+WL_ITERATIONS = 3
+
+# MinHash 64 permutasi, LSH 16 band x 4 baris
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _h64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _permutations():
+    params = []
+    for i in range(MINHASH_PERMUTATIONS):
+        seed = hashlib.blake2b(f"minhash-{i}".encode("utf-8"), digest_size=16).digest()
+        a = int.from_bytes(seed[:8], "big") % (_PRIME - 1) + 1
+        b = int.from_bytes(seed[8:], "big") % _PRIME
+        params.append((a, b))
+    return params
+
+_PERMUTATIONS = _permutations()
+
+
+def _initial_label(node):
+    data = node.get("data", {})
+    node_type = data.get("node_type", "default")
+    # Start/End sama-sama "control", bedakan dengan labelnya
+    if node_type == "control":
+        return f"control:{data.get('label')}"
+    return node_type
+
+
+def wl_labels(nodes, edges, iterations=WL_ITERATIONS):
+    """Multiset of WL labels over all iterations; source text and line numbers are ignored."""
+    labels = {node["id"]: _initial_label(node) for node in nodes}
+    succ = {node_id: [] for node_id in labels}
+    pred = {node_id: [] for node_id in labels}
+    for edge in edges:
+        source, target = edge["source"], edge["target"]
+        if source in labels and target in labels:
+            kind = edge.get("label") or ""
+            succ[source].append((target, kind))
+            pred[target].append((source, kind))
+
+    collected = list(labels.values())
+    for _ in range(iterations):
+        new_labels = {}
+        for node_id, label in labels.items():
+            out_part = ",".join(sorted(f"{kind}>{labels[n]}" for n, kind in succ[node_id]))
+            in_part = ",".join(sorted(f"{kind}<{labels[n]}" for n, kind in pred[node_id]))
+            signature = f"{label}|{out_part}|{in_part}"
+            new_labels[node_id] = hashlib.blake2b(signature.encode("utf-8"), digest_size=8).hexdigest()
+        labels = new_labels
+        collected.extend(labels.values())
+    return collected
+
+
+def _labels_digest(labels):
+    return hashlib.sha1("\n".join(sorted(labels)).encode("utf-8")).hexdigest()
+
+
+def wl_hash(nodes, edges):
+    return _labels_digest(wl_labels(nodes, edges))
+
+
+def minhash(shingles):
+    hashes = [_h64(s) for s in set(shingles)] or [0]
+    return [
+        min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def lsh_bands(signature):
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(f"{band}:{rows}".encode("utf-8"), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def pack_signature(signature):
+    return struct.pack(f">{len(signature)}I", *signature)
+
+
+def unpack_signature(data):
+    return list(struct.unpack(f">{len(data) // 4}I", data))
+
+
+def estimate_similarity(sig_a, sig_b):
+    if not sig_a or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+def fingerprint_cfg(nodes, edges):
+    """WL hash, MinHash signature and LSH band keys of one CFG."""
+    labels = wl_labels(nodes, edges)
+    signature = minhash(labels)
+    return {
+        "wl_hash": _labels_digest(labels),
+        "minhash": signature,
+        "bands": lsh_bands(signature),
+    }
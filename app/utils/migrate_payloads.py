@@ -0,0 +1,81 @@
+"""One-shot migration of the codes payload columns to compressed blobs.
+
+Rows written before CompressedJSON hold plain JSON text. They stay readable
+(the column type decodes both), but only the blob form saves space:
+
+    python -m app.utils.migrate_payloads [--db cfg.db] [--batch 500]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+from app.database import DB_PATH
+from app.model.types import decode_payload, encode_payload
+from app.utils.sql_functions import register_sql_functions
+
+PAYLOAD_COLUMNS = ("path_list", "nodes_list", "edges_list", "test_cases")
+
+
+def migrate(db_path, batch_size=500):
+    size_before = os.path.getsize(db_path)
+    conn = sqlite3.connect(db_path)
+    # UPDATE codes memicu trigger indeks pencarian yang memanggil fungsi ini
+    register_sql_functions(conn)
+    columns = ", ".join(PAYLOAD_COLUMNS)
+    assignments = ", ".join(f"{col} = ?" for col in PAYLOAD_COLUMNS)
+
+    text_bytes = 0
+    blob_bytes = 0
+    migrated = 0
+    start = time.perf_counter()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            f"SELECT id, {columns} FROM codes WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            last_id = row[0]
+            values = row[1:]
+            if not any(isinstance(v, str) for v in values):
+                continue
+            encoded = []
+            for value in values:
+                if isinstance(value, str):
+                    text_bytes += len(value.encode("utf-8"))
+                    value = encode_payload(decode_payload(value))
+                    blob_bytes += len(value)
+                encoded.append(value)
+            updates.append((*encoded, row[0]))
+        conn.executemany(f"UPDATE codes SET {assignments} WHERE id = ?", updates)
+        conn.commit()
+        migrated += len(updates)
+    elapsed = time.perf_counter() - start
+
+    conn.execute("VACUUM")
+    conn.close()
+    return {
+        "rows_migrated": migrated,
+        "payload_bytes_before": text_bytes,
+        "payload_bytes_after": blob_bytes,
+        "db_bytes_before": size_before,
+        "db_bytes_after": os.path.getsize(db_path),
+        "seconds": round(elapsed, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress codes payload columns")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+    print(json.dumps(migrate(args.db, args.batch), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import base64
+import datetime
+import json
+
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, row_id):
+    raw = json.dumps([created_at.isoformat() if created_at else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor.")
+
+
+def keyset_page(stmt, created_col, id_col, limit, cursor=None):
+    """Newest first, continuing after the (created_at, id) encoded in cursor.
+
+    created_at is never NULL (upgrade_schema backfills old rows), so the
+    row-value comparison seeks on the (created_at, id) index.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(created_col, id_col) < tuple_(created_at, row_id))
+    # Ambil satu baris ekstra untuk tahu apakah masih ada halaman berikutnya
+    return stmt.order_by(created_col.desc(), id_col.desc()).limit(limit + 1)
+
+
+def page_result(rows, limit):
+    items = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,19 @@
+"""Start method for every child process the server creates.
+
+fork is unsafe in the server: it copies held locks, executor threads and open
+SQLite connections into the child. forkserver forks from a clean,
+single-threaded server process instead; Windows only has spawn.
+"""
+import multiprocessing
+
+# Dimuat sekali di forkserver sehingga anak tidak mengimpor ulang modul berat.
+# Satu daftar untuk semua pemakai: preload hanya berlaku sebelum forkserver jalan.
+FORKSERVER_PRELOAD = ["app.service.cfg_builder", "app.service.execution_sandbox"]
+
+
+def process_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(FORKSERVER_PRELOAD)
+        return context
+    return multiprocessing.get_context("spawn")
@@ -0,0 +1,39 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets charged by request cost instead of request count.
+
+    Each client starts with a full bucket of `capacity` tokens that refills at
+    `refill_rate` tokens per second. A request costing more than the capacity
+    is charged the full bucket.
+    """
+
+    def __init__(self, capacity, refill_rate, max_clients=10000, clock=time.monotonic):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.max_clients = max_clients
+        self.clock = clock
+        # key -> (tokens, waktu update terakhir); urutan = paling lama tidak dipakai dulu
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key, cost):
+        """Charge cost to key's bucket. Returns 0.0 if admitted, else seconds until it would be."""
+        cost = min(float(cost), self.capacity)
+        with self._lock:
+            now = self.clock()
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / self.refill_rate
+            self._buckets[key] = (tokens, now)
+            # Bucket yang lama tidak dipakai sudah penuh lagi, aman dibuang
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return wait
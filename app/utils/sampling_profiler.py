@@ -0,0 +1,111 @@
+"""Statistical profiler: samples the Python stack of every thread at a fixed interval.
+
+A sampler (unlike cProfile) also sees the executor threads where analyses
+run, and its overhead does not grow with the number of function calls.
+Stacks of idle threads (waiting on a queue, lock or selector) are dropped.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Frame terdalam di modul ini berarti thread sedang menunggu, bukan bekerja
+IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+# Loop worker yang menunggu di fungsi C (SimpleQueue.get): frame terdalamnya loop itu sendiri
+IDLE_FUNCTIONS = (
+    ("concurrent/futures/thread.py", "_worker"),
+    ("aiosqlite/core.py", "_connection_worker_thread"),
+)
+
+
+def _is_idle(code):
+    filename = code.co_filename.replace(os.sep, "/")
+    if filename.endswith(IDLE_MODULES):
+        return True
+    return any(filename.endswith(path) and code.co_name == name for path, name in IDLE_FUNCTIONS)
+
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(_ROOT):
+        filename = os.path.relpath(filename, _ROOT)
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{code.co_name}:{code.co_firstlineno}"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.001, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.stopped = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.stopped = time.perf_counter()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                if _is_idle(frame.f_code):
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+
+    def report(self, limit=20):
+        """Top stacks (outermost frame first) and top functions by own and total samples."""
+        total = self.samples or 1
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for code in set(stack):
+                inclusive[code] += count
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "duration_ms": round(((self.stopped or time.perf_counter()) - self.started) * 1000, 3),
+            "top_stacks": [
+                {
+                    "samples": count,
+                    "percent": round(100 * count / total, 1),
+                    "stack": [_frame_label(code) for code in stack],
+                }
+                for stack, count in self.stacks.most_common(limit)
+            ],
+            "top_functions": [
+                {
+                    "function": _frame_label(code),
+                    "self_samples": count,
+                    "total_samples": inclusive[code],
+                    "self_percent": round(100 * count / total, 1),
+                }
+                for code, count in own.most_common(limit)
+            ],
+        }
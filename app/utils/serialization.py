@@ -0,0 +1,58 @@
+"""Response serialization for the heavy endpoints.
+
+Clients that send `Accept: application/msgpack` get MessagePack, everyone
+else gets JSON encoded with orjson when it is installed. Both backends are
+optional: without them the standard library json module is used.
+"""
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+
+def _default(value):
+    # Nilai yang tidak dikenal encoder (set, datetime, objek hasil eksekusi kode user)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+def dumps_json(data):
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        except (TypeError, orjson.JSONEncodeError):
+            # Misalnya integer di luar 64-bit, biarkan json standar yang menangani
+            pass
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(data):
+    return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+def wants_msgpack(accept=None):
+    return msgpack is not None and bool(accept) and any(t in accept for t in MSGPACK_MEDIA_TYPES)
+
+
+def render(data, accept=None, json_media_type=JSON_MEDIA_TYPE):
+    """Serialize data with the backend the Accept header asks for."""
+    if wants_msgpack(accept):
+        try:
+            return Response(dumps_msgpack(data), media_type=MSGPACK_MEDIA_TYPE)
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return Response(dumps_json(data), media_type=json_media_type)
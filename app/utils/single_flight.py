@@ -0,0 +1,71 @@
+import asyncio
+import hashlib
+
+
+def source_key(kind, source, *options):
+    """Coalescing key: request kind, sha256 of the source and any options that change the result."""
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
+    return (kind, digest) + tuple(options)
+
+
+class SingleFlight:
+    """Concurrent calls with the same key wait on one computation and share its result.
+
+    Only in-flight calls are shared; once the computation finishes the key is
+    forgotten, so this is deduplication, not a cache. The shared result must be
+    treated as read-only by every caller. The computation is cancelled when
+    every caller waiting on it has been cancelled.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._inflight)
+
+    def in_flight(self, key):
+        return key in self._inflight
+
+    def join(self, key, func, *args):
+        """Join (or start) the flight for key right away; returns a coroutine for its result.
+
+        Registration happens before the first await, so a caller that checks
+        in_flight() right after sees this flight. The coroutine must be awaited.
+        """
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.started += 1
+            flight = _Flight(asyncio.ensure_future(func(*args)))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda done: self._forget(key, flight))
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        return self._wait(flight)
+
+    async def do(self, key, func, *args):
+        return await self.join(key, func, *args)
+
+    async def _wait(self, flight):
+        try:
+            # shield: pemanggil yang dibatalkan tidak ikut membatalkan pemanggil lain
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Semua peminta sudah pergi, komputasinya tidak dibutuhkan lagi
+                flight.task.cancel()
+
+    def _forget(self, key, flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
@@ -0,0 +1,41 @@
+"""Python functions callable from SQL, registered on every SQLite connection.
+
+The search index reads code content through the codes_search view; source and
+nodes are stored as compressed blobs that only these functions can decode.
+Every connection that writes to codes needs them (the FTS triggers call them),
+including raw sqlite3 connections outside the engines.
+"""
+from app.model.types import decode_payload
+
+
+def node_labels(nodes):
+    return "\n".join(
+        str(node.get("data", {}).get("tooltip", ""))
+        for node in nodes or []
+        if isinstance(node, dict)
+    )
+
+
+def payload_text(value):
+    """Source code from a blob (encoded payload) or the inline text column."""
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        return decode_payload(value) or ""
+    return value
+
+
+def payload_labels(value):
+    """Node statements from a nodes blob or inline nodes_list, one per line."""
+    return node_labels(decode_payload(value))
+
+
+SQL_FUNCTIONS = {
+    "payload_text": payload_text,
+    "payload_labels": payload_labels,
+}
+
+
+def register_sql_functions(dbapi_connection):
+    for name, function in SQL_FUNCTIONS.items():
+        dbapi_connection.create_function(name, 1, function, deterministic=True)
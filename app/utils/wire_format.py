@@ -0,0 +1,121 @@
+"""Compact encoding of a CFG response.
+
+The classic React Flow shape repeats `type: custom`, label/tooltip and the
+full style/markerEnd dicts on every node and edge. The compact shape stores
+nodes and edges column by column, uses integer ids and references a shared
+style table by index. `expand_cfg` turns it back into the classic shape.
+"""
+
+COMPACT_MEDIA_TYPE = "application/vnd.testflow.compact+json"
+COMPACT_FORMAT = "compact-v1"
+
+# Field di luar nodes/edges yang memuat id node; id-nya ikut jadi integer
+NODE_REF_FIELDS = ("unreachable_code",)
+
+
+def wants_compact(format=None, accept=None):
+    """Return True when the client asked for the compact encoding."""
+    if format:
+        return format == "compact"
+    return bool(accept) and COMPACT_MEDIA_TYPE in accept
+
+
+def _style_key(edge):
+    style = edge.get("style", {})
+    marker = edge.get("markerEnd", {})
+    return (tuple(sorted(style.items())), tuple(sorted(marker.items())))
+
+
+def compact_cfg(cfg):
+    if not cfg or "nodes" not in cfg:
+        return cfg
+
+    node_cols = {"id": [], "x": [], "y": [], "tooltip": [], "lineno": [], "node_type": []}
+    for node in cfg["nodes"]:
+        data = node["data"]
+        node_cols["id"].append(int(node["id"]))
+        node_cols["x"].append(node["position"]["x"])
+        node_cols["y"].append(node["position"]["y"])
+        # label selalu str(lineno) atau sama dengan tooltip, jadi tidak perlu dikirim
+        node_cols["tooltip"].append(data["tooltip"])
+        node_cols["lineno"].append(data["lineno"])
+        node_cols["node_type"].append(data["node_type"])
+
+    styles = []
+    style_index = {}
+    edge_cols = {"source": [], "target": [], "label": [], "style": [], "type": [], "edge_type": []}
+    for edge in cfg["edges"]:
+        key = _style_key(edge)
+        if key not in style_index:
+            style_index[key] = len(styles)
+            styles.append({"style": edge.get("style", {}), "markerEnd": edge.get("markerEnd", {})})
+        edge_cols["source"].append(int(edge["source"]))
+        edge_cols["target"].append(int(edge["target"]))
+        edge_cols["label"].append(edge.get("label"))
+        edge_cols["style"].append(style_index[key])
+        edge_cols["type"].append(edge.get("type"))
+        edge_cols["edge_type"].append(edge.get("edge_type"))
+
+    # Kolom opsional yang kosong semua tidak ikut dikirim
+    for col in ("label", "type", "edge_type"):
+        if not any(v is not None for v in edge_cols[col]):
+            del edge_cols[col]
+
+    compact = {key: value for key, value in cfg.items() if key not in ("nodes", "edges")}
+    for field in NODE_REF_FIELDS:
+        if compact.get(field):
+            compact[field] = [{**entry, "id": int(entry["id"])} for entry in compact[field]]
+    compact["format"] = COMPACT_FORMAT
+    compact["styles"] = styles
+    compact["nodes"] = node_cols
+    compact["edges"] = edge_cols
+    return compact
+
+
+def expand_cfg(compact):
+    """Inverse of compact_cfg, returns the classic React Flow shape."""
+    if not compact or compact.get("format") != COMPACT_FORMAT:
+        return compact
+
+    cols = compact["nodes"]
+    nodes = []
+    for i, node_id in enumerate(cols["id"]):
+        lineno = cols["lineno"][i]
+        tooltip = cols["tooltip"][i]
+        nodes.append({
+            "id": str(node_id),
+            "type": "custom",
+            "position": {"x": cols["x"][i], "y": cols["y"][i]},
+            "data": {
+                "label": str(lineno) if lineno else tooltip,
+                "tooltip": tooltip,
+                "lineno": lineno,
+                "node_type": cols["node_type"][i]
+            }
+        })
+
+    cols = compact["edges"]
+    styles = compact["styles"]
+    edges = []
+    for i, source in enumerate(cols["source"]):
+        target = cols["target"][i]
+        shared = styles[cols["style"][i]]
+        edge = {
+            "id": f"e{source}-{target}",
+            "source": str(source),
+            "target": str(target),
+            "markerEnd": dict(shared["markerEnd"]),
+            "style": dict(shared["style"])
+        }
+        for col in ("label", "type", "edge_type"):
+            if col in cols and cols[col][i] is not None:
+                edge[col] = cols[col][i]
+        edges.append(edge)
+
+    cfg = {key: value for key, value in compact.items() if key not in ("format", "styles", "nodes", "edges")}
+    for field in NODE_REF_FIELDS:
+        if cfg.get(field):
+            cfg[field] = [{**entry, "id": str(entry["id"])} for entry in cfg[field]]
+    cfg["nodes"] = nodes
+    cfg["edges"] = edges
+    return cfg
@@ -0,0 +1,260 @@
+"""Differential check and timing of alternative CFG builders against app/service/cfg_builder.py.
+
+Every registered builder (by default the reference builder plus each file in
+coba_coba_kode/) builds the same corpus: the functions of kode_pengujian.py
+and test.py and the synthetic programs of benchmarks/synthetic.py. Outputs
+are normalized so node ids and layout do not matter, then diffed with the
+reference on nodes, edges and execution paths:
+
+    node   (lineno, node_type, tooltip), or (label, node_type) without a line
+    edge   (source node, target node, label)
+    path   the line numbers generate_execution_paths() returns
+
+    python -m benchmarks.builders [--rounds 5] [--builder name=path/to/file.py[:function]]
+        [--only paling_bagus_cfg_builder] [--case synthetic] [--diff] [--json]
+
+The reference is extract_cfg() on the parsed source, without the stage()
+timers and the parallel partition build_cfg() adds, so both sides of "vs app"
+do the same kind of work.
+
+A builder can only be promoted if it agrees on every case ("paths ok" counts
+cases where only the graph differs but the execution paths are the same); the
+table shows whether it is also faster and lighter (tracemalloc peak of one
+build). "vs app" is only shown for builders that agree on every case: a faster
+but wrong CFG is not a speedup.
+"""
+import argparse
+import ast
+import glob
+import importlib.util
+import io
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import redirect_stdout
+
+from app.service.cfg_builder import extract_cfg
+from app.service.path_builder import generate_execution_paths
+from benchmarks.pipeline import corpus_cases, synthetic_cases
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VARIANTS_DIR = os.path.join(BASE_DIR, "coba_coba_kode")
+
+REFERENCE = "app"
+BUILDERS = {}
+
+
+def register(name, build):
+    """Add a builder: a function taking source code and returning {"nodes", "edges", ...}."""
+    BUILDERS[name] = build
+
+
+def load_builder(path, function="build_cfg"):
+    # Nama file seperti 100%.py tidak bisa diimpor biasa, jadi dimuat dari path-nya
+    module_name = "cfg_variant_" + re.sub(r"\W", "_", os.path.splitext(os.path.basename(path))[0])
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, function)
+
+
+def reference_build(code):
+    nodes, edges, parameters = extract_cfg(ast.parse(code))
+    return {"nodes": nodes, "edges": edges, "parameters": parameters}
+
+
+def register_defaults():
+    register(REFERENCE, reference_build)
+    for path in sorted(glob.glob(os.path.join(VARIANTS_DIR, "*.py"))):
+        register(os.path.splitext(os.path.basename(path))[0], load_builder(path))
+
+
+def _node_key(node):
+    data = node.get("data", {})
+    if data.get("lineno"):
+        return (data["lineno"], data.get("node_type"), data.get("tooltip"))
+    return (data.get("label"), data.get("node_type"))
+
+
+def normalize(cfg):
+    """Multisets of nodes, edges and paths, independent of node ids and positions."""
+    keys = {node["id"]: _node_key(node) for node in cfg["nodes"]}
+    return {
+        "nodes": Counter(keys.values()),
+        "edges": Counter(
+            (keys.get(edge["source"]), keys.get(edge["target"]), edge.get("label"))
+            for edge in cfg["edges"]
+        ),
+        "paths": Counter(tuple(path) for path in generate_execution_paths(cfg)),
+    }
+
+
+def diff(expected, actual):
+    """Per part: items only the reference has (missing) and items only the builder has (extra)."""
+    result = {}
+    for part in ("nodes", "edges", "paths"):
+        missing = expected[part] - actual[part]
+        extra = actual[part] - expected[part]
+        if missing or extra:
+            result[part] = {"missing": sorted(map(repr, missing.elements())),
+                            "extra": sorted(map(repr, extra.elements()))}
+    return result
+
+
+def run_builder(build, source, rounds):
+    # Beberapa varian masih mencetak pesan DEBUG; tetap dihitung dalam waktunya, tapi tidak ditampilkan
+    with redirect_stdout(io.StringIO()):
+        return _run_builder(build, source, rounds)
+
+
+def _run_builder(build, source, rounds):
+    try:
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            cfg = build(source)
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            build(source)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    if not isinstance(cfg, dict) or "nodes" not in cfg:
+        message = cfg.get("message") if isinstance(cfg, dict) else None
+        return {"error": message or "no CFG returned"}
+    return {"cfg": cfg, "seconds": best, "peak_bytes": peak}
+
+
+def run(builders, cases, rounds):
+    """Per builder: totals over the corpus and the cases where it disagrees with the reference."""
+    reference = {}
+    for name, source, _ in cases:
+        outcome = run_builder(BUILDERS[REFERENCE], source, 1)
+        if "cfg" in outcome:
+            reference[name] = normalize(outcome["cfg"])
+
+    report = {}
+    for builder in builders:
+        build = BUILDERS[builder]
+        summary = {"cases": 0, "agree": 0, "paths_agree": 0, "errors": 0, "total_ms": 0.0, "max_peak_kib": 0.0,
+                   "per_case": {}, "differences": {}}
+        for name, source, _ in cases:
+            if name not in reference:
+                continue
+            summary["cases"] += 1
+            outcome = run_builder(build, source, rounds)
+            if "error" in outcome:
+                summary["errors"] += 1
+                summary["differences"][name] = {"error": outcome["error"]}
+                continue
+            ms = outcome["seconds"] * 1000
+            peak_kib = outcome["peak_bytes"] / 1024
+            summary["total_ms"] += ms
+            summary["max_peak_kib"] = max(summary["max_peak_kib"], peak_kib)
+            summary["per_case"][name] = {"ms": round(ms, 4), "peak_kib": round(peak_kib, 1)}
+            try:
+                differences = diff(reference[name], normalize(outcome["cfg"]))
+            except Exception as e:
+                differences = {"error": f"{type(e).__name__}: {e}"}
+            if differences:
+                summary["differences"][name] = differences
+            else:
+                summary["agree"] += 1
+            if not differences or ("paths" not in differences and "error" not in differences):
+                summary["paths_agree"] += 1
+        summary["total_ms"] = round(summary["total_ms"], 3)
+        summary["max_peak_kib"] = round(summary["max_peak_kib"], 1)
+        report[builder] = summary
+    return report
+
+
+def speedup(report, builder):
+    """Reference time / builder time over the cases both built (errors would flatter the builder)."""
+    reference = report.get(REFERENCE, {}).get("per_case", {})
+    cases = [case for case in report[builder]["per_case"] if case in reference]
+    own = sum(report[builder]["per_case"][case]["ms"] for case in cases)
+    if not cases or not own:
+        return None
+    return sum(reference[case]["ms"] for case in cases) / own
+
+
+def print_report(report, show_diff, limit=5):
+    print(f"{'builder':<28} {'agree':>9} {'paths ok':>9} {'errors':>6} {'total ms':>10} {'vs app':>7} {'peak KiB':>9}")
+    for builder, s in report.items():
+        ratio = speedup(report, builder) if s["agree"] == s["cases"] else None
+        ratio = f"x{ratio:.2f}" if ratio else "-"
+        print(f"{builder:<28} {s['agree']:>4}/{s['cases']:<4} {s['paths_agree']:>4}/{s['cases']:<4} "
+              f"{s['errors']:>6} {s['total_ms']:>10} {ratio:>7} {s['max_peak_kib']:>9}")
+    variants = [builder for builder in report if builder != REFERENCE]
+    disagreeing = [builder for builder in variants if report[builder]["agree"] < report[builder]["cases"]]
+    if disagreeing:
+        print(f"\n{len(disagreeing)} of {len(variants)} builders disagree with {REFERENCE}; "
+              "no speedup is shown for them:")
+        for builder in disagreeing:
+            s = report[builder]
+            print(f"  {builder}: differs on {s['cases'] - s['agree']}/{s['cases']} cases")
+    if not show_diff:
+        return
+    for builder, s in report.items():
+        for case, differences in s["differences"].items():
+            print(f"\n{builder} / {case}")
+            if "error" in differences:
+                print(f"  error: {differences['error']}")
+                continue
+            for part, d in differences.items():
+                for kind in ("missing", "extra"):
+                    items = d[kind]
+                    for item in items[:limit]:
+                        print(f"  {part} {kind}: {item}")
+                    if len(items) > limit:
+                        print(f"  {part} {kind}: ... {len(items) - limit} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--builder", action="append", default=[],
+                        help="extra builder as name=path.py[:function] (function defaults to build_cfg)")
+    parser.add_argument("--only", action="append", help="only run these builders (the reference always runs)")
+    parser.add_argument("--case", action="append", help="only run cases whose label contains this text")
+    parser.add_argument("--ifs", type=int, nargs="*", default=[4, 8])
+    parser.add_argument("--depth", type=int, nargs="*", default=[4, 16])
+    parser.add_argument("--loops", type=int, nargs="*", default=[2, 8])
+    parser.add_argument("--diff", action="store_true", help="print what each disagreeing builder got wrong")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    register_defaults()
+    for spec in args.builder:
+        name, _, target = spec.partition("=")
+        path, _, function = target.partition(":")
+        if not name or not path:
+            sys.exit(f"--builder expects name=path.py[:function], got {spec!r}")
+        register(name, load_builder(path, function or "build_cfg"))
+
+    builders = list(BUILDERS)
+    if args.only:
+        builders = [REFERENCE] + [name for name in builders if name in args.only and name != REFERENCE]
+
+    cases = corpus_cases() + synthetic_cases(args.ifs, args.depth, args.loops)
+    if args.case:
+        cases = [case for case in cases if any(text in case[0] for text in args.case)]
+    if not cases:
+        sys.exit("No cases selected.")
+
+    report = run(builders, cases, args.rounds)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args.diff)
+
+
+if __name__ == "__main__":
+    main()
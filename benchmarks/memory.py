@@ -0,0 +1,293 @@
+"""Memory footprint of each analysis stage as the input grows, with budgets.
+
+Every case runs in a fresh (spawned) process so peaks do not carry over. For
+each stage (build_cfg, paths, unreachable, execute, trace) it records:
+
+    peak_mib   tracemalloc peak of the stage
+    rss_mib    peak RSS of the process during the stage (VmHWM, reset before
+               each stage on Linux; ru_maxrss elsewhere, which only grows)
+
+Earlier outputs stay alive while later stages run, like in a request. The
+peak RSS of a request type is the highest of its stages:
+
+    analyze          build_cfg, paths, unreachable         (/analyze/, jobs)
+    test_execution   build_cfg, paths, execute, trace      (/test_execution/)
+
+Inputs grow along three axes: straight-line statements, sequential ifs
+(2**n paths) and iterations of a traced loop.
+
+    python -m benchmarks.memory [--statements 100 400 800] [--ifs 6 10 14] [--iterations 1000 10000 100000]
+        [--budget paths=256] [--rss-budget test_execution=512] [--top 10] [--json]
+
+--budget (tracemalloc MiB per stage) and --rss-budget (MiB per request type)
+override the defaults below; any case over budget makes the exit status 1.
+The report lists the call sites in cfg_builder.py, path_builder.py and
+execution_tester.py holding the most memory after each stage.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tracemalloc
+from contextlib import redirect_stdout
+
+from benchmarks import synthetic
+
+STAGES = ("build_cfg", "paths", "unreachable", "execute", "trace")
+REQUEST_TYPES = {
+    "analyze": ("build_cfg", "paths", "unreachable"),
+    "test_execution": ("build_cfg", "paths", "execute", "trace"),
+}
+
+# MiB; cukup longgar untuk ukuran default, ketat untuk input yang meledak
+DEFAULT_BUDGETS = {"build_cfg": 64, "paths": 256, "unreachable": 64, "execute": 64, "trace": 128}
+DEFAULT_RSS_BUDGETS = {"analyze": 512, "test_execution": 512}
+
+TRACKED_FILES = ("cfg_builder.py", "path_builder.py", "execution_tester.py")
+MIB = 1024 * 1024
+
+
+def _status_kib(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    # Linux: menulis "5" ke clear_refs mereset VmHWM ke RSS saat ini
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mib():
+    kib = _status_kib("VmHWM")
+    if kib is None:
+        import resource
+
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss dalam byte di macOS, KiB di Linux
+        kib = maxrss / 1024 if sys.platform == "darwin" else maxrss
+    return kib / 1024
+
+
+def _stage_functions(source, parameters):
+    from app.service.cfg_builder import build_cfg
+    from app.service.execution_tester import test_code_with_parameters, trace_execution_path
+    from app.service.path_builder import generate_execution_paths
+    from app.utils.unreachable_nodes import detect_unreachable_code
+
+    outputs = {}
+
+    def paths():
+        cfg = outputs["build_cfg"]
+        cfg["execution_paths"] = generate_execution_paths(cfg)
+        return cfg["execution_paths"]
+
+    return outputs, {
+        "build_cfg": lambda: build_cfg(source),
+        "paths": paths,
+        "unreachable": lambda: detect_unreachable_code(outputs["build_cfg"]),
+        "execute": lambda: test_code_with_parameters(source, parameters),
+        "trace": lambda: trace_execution_path(source, parameters),
+    }
+
+
+def _call_sites(snapshot, before, top):
+    # Disaring setelah dikelompokkan: Snapshot.filter_traces (fnmatch per trace) jauh lebih lambat
+    sites = []
+    for stat in snapshot.compare_to(before, "lineno"):
+        if len(sites) >= top or stat.size_diff <= 0:
+            break
+        frame = stat.traceback[0]
+        if not frame.filename.endswith(TRACKED_FILES):
+            continue
+        sites.append({
+            "site": f"{os.path.basename(frame.filename)}:{frame.lineno}",
+            "kib": round(stat.size_diff / 1024, 1),
+            "blocks": stat.count_diff,
+        })
+    return sites
+
+
+def _run_stage(stages, outputs, stage):
+    try:
+        outputs[stage] = stages[stage]()
+        return None
+    except Exception as e:
+        # Mis. RecursionError di enumerasi path: dicatat sebagai hasil, bukan menghentikan benchmark
+        outputs[stage] = None
+        return f"{type(e).__name__}: {e}"
+
+
+def measure_case(case):
+    """Runs in a child process: RSS pass first (untraced), then the tracemalloc pass."""
+    name, source, parameters, top = case
+    result = {"case": name, "stages": {}}
+    with redirect_stdout(io.StringIO()):
+        # Pass 1: RSS tanpa tracemalloc (tracemalloc sendiri menambah memori per alokasi)
+        outputs, stages = _stage_functions(source, parameters)
+        baseline = peak_rss_mib()
+        for stage in STAGES:
+            reset_peak_rss()
+            error = _run_stage(stages, outputs, stage)
+            if stage == "build_cfg" and "message" in outputs["build_cfg"]:
+                return {"case": name, "error": outputs["build_cfg"]["message"]}
+            result["stages"][stage] = {"rss_mib": round(peak_rss_mib(), 1)}
+            if error:
+                result["stages"][stage]["error"] = error
+        result["nodes"] = len(outputs["build_cfg"]["nodes"])
+        result["paths"] = len(outputs["paths"]) if outputs["paths"] is not None else None
+        result["trace_length"] = len(outputs["trace"]) if outputs["trace"] is not None else None
+        del outputs, stages
+
+        # Pass 2: tracemalloc, dengan output tahap sebelumnya tetap hidup
+        outputs, stages = _stage_functions(source, parameters)
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot() if top else None
+            for stage in STAGES:
+                tracemalloc.reset_peak()
+                start_size, _ = tracemalloc.get_traced_memory()
+                _run_stage(stages, outputs, stage)
+                size, peak = tracemalloc.get_traced_memory()
+                result["stages"][stage].update({
+                    "peak_mib": round((peak - start_size) / MIB, 3),
+                    "retained_mib": round((size - start_size) / MIB, 3),
+                    "call_sites": [],
+                })
+                if top:
+                    # Snapshot sesudah tahap ini jadi titik awal tahap berikutnya
+                    after = tracemalloc.take_snapshot()
+                    result["stages"][stage]["call_sites"] = _call_sites(after, before, top)
+                    before = after
+        finally:
+            tracemalloc.stop()
+    result["baseline_rss_mib"] = round(baseline, 1)
+    result["request_rss_mib"] = {
+        kind: max(result["stages"][stage]["rss_mib"] for stage in stages_of)
+        for kind, stages_of in REQUEST_TYPES.items()
+    }
+    return result
+
+
+def build_cases(statements, ifs, iterations, top):
+    cases = []
+    for name, source in synthetic.grid(statements=statements, ifs=ifs):
+        cases.append((name, source, {"x": 10}, top))
+    # Satu loop yang dilacak; panjang trace tumbuh dengan jumlah iterasi
+    for count in iterations:
+        cases.append((f"{synthetic.label(loops=1)},x={count}", synthetic.program(loops=1), {"x": count}, top))
+    return cases
+
+
+def run(cases):
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        return list(pool.imap(measure_case, cases))
+
+
+def check_budgets(results, budgets, rss_budgets):
+    violations = []
+    for r in results:
+        if "error" in r:
+            continue
+        for stage, limit in budgets.items():
+            value = r["stages"][stage]["peak_mib"]
+            if value > limit:
+                violations.append(f"{r['case']} {stage}: tracemalloc peak {value} MiB > {limit} MiB")
+        for kind, limit in rss_budgets.items():
+            value = r["request_rss_mib"][kind]
+            if value > limit:
+                violations.append(f"{r['case']} {kind}: peak RSS {value} MiB > {limit} MiB")
+    return violations
+
+
+def _parse_limits(values, allowed, defaults, option):
+    limits = dict(defaults)
+    for value in values:
+        key, _, mib = value.partition("=")
+        if key not in allowed:
+            sys.exit(f"{option}: unknown name {key!r} (expected one of {', '.join(allowed)})")
+        try:
+            limits[key] = float(mib)
+        except ValueError:
+            sys.exit(f"{option} expects name=MiB, got {value!r}")
+    return limits
+
+
+def print_report(results, top):
+    print(f"{'case':<34} {'nodes':>6} {'paths':>6} {'trace':>7}"
+          + "".join(f" {stage[:11] + ' MiB':>15}" for stage in STAGES)
+          + "".join(f" {kind[:14] + ' RSS':>18}" for kind in REQUEST_TYPES))
+    for r in results:
+        if "error" in r:
+            print(f"{r['case']:<34} {r['error']}")
+            continue
+        cells = "".join(
+            f" {'error' if 'error' in r['stages'][stage] else r['stages'][stage]['peak_mib']:>15}" for stage in STAGES
+        )
+        rss = "".join(f" {r['request_rss_mib'][kind]:>18}" for kind in REQUEST_TYPES)
+        print(f"{r['case']:<34} {r['nodes']:>6} {r['paths'] or '-':>6} {r['trace_length'] or '-':>7}{cells}{rss}")
+        for stage in STAGES:
+            if "error" in r["stages"][stage]:
+                print(f"{'':<34} {stage} failed: {r['stages'][stage]['error'][:100]}")
+    if not top:
+        return
+    print("\nAllocations still held after each stage, by call site (largest case of each input axis):")
+    largest = {}
+    for r in results:
+        if "error" not in r:
+            largest[r["case"].split("=")[0]] = r
+    for r in largest.values():
+        for stage in STAGES:
+            sites = r["stages"][stage]["call_sites"]
+            if not sites:
+                continue
+            print(f"\n{r['case']} / {stage}")
+            for site in sites:
+                print(f"  {site['kib']:>10} KiB {site['blocks']:>8} blocks  {site['site']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--statements", type=int, nargs="*", default=[100, 400, 800])
+    parser.add_argument("--ifs", type=int, nargs="*", default=[6, 10, 14])
+    parser.add_argument("--iterations", type=int, nargs="*", default=[1000, 10000, 100000])
+    parser.add_argument("--budget", action="append", default=[], metavar="STAGE=MIB",
+                        help="tracemalloc peak budget for one stage")
+    parser.add_argument("--rss-budget", action="append", default=[], metavar="TYPE=MIB",
+                        help="peak RSS budget for one request type")
+    parser.add_argument("--top", type=int, default=5, help="call sites per stage in the report (0 = none)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    budgets = _parse_limits(args.budget, STAGES, DEFAULT_BUDGETS, "--budget")
+    rss_budgets = _parse_limits(args.rss_budget, tuple(REQUEST_TYPES), DEFAULT_RSS_BUDGETS, "--rss-budget")
+
+    results = run(build_cases(args.statements, args.ifs, args.iterations, args.top))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, args.top)
+
+    violations = check_budgets(results, budgets, rss_budgets)
+    for violation in violations:
+        print(f"OVER BUDGET {violation}", file=sys.stderr)
+    if violations:
+        sys.exit(1)
+    print("All cases within budget.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Per-stage timings of the analysis pipeline, with JSON baselines.
+
+Times build_cfg, generate_execution_paths, detect_unreachable_code,
+test_code_with_parameters and trace_execution_path on every function of
+kode_pengujian.py and test.py and on synthetic programs (benchmarks/synthetic.py).
+
+    python -m benchmarks.pipeline [--rounds 5] [--ifs 4 8 12] [--depth 4 16 64] [--loops 2 4 8]
+        [--case cek_positif] [--save-baseline baseline.json] [--compare baseline.json --threshold 0.2]
+
+--compare exits with status 1 if any stage got slower than the baseline by
+more than the threshold (0.2 = 20%). Stages faster than --min-ms in both runs
+are only reported, not flagged: at that size the noise is larger than the change.
+"""
+import argparse
+import ast
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+
+from app.service.cfg_builder import build_cfg
+from app.service.execution_tester import test_code_with_parameters, trace_execution_path
+from app.service.path_builder import generate_execution_paths
+from app.utils.unreachable_nodes import detect_unreachable_code
+from benchmarks import synthetic
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPORA = [os.path.join(BASE_DIR, "kode_pengujian.py"), os.path.join(BASE_DIR, "test.py")]
+
+STAGES = ("build_cfg", "paths", "unreachable", "execute", "trace")
+
+DEFAULT_ARGUMENT = 10
+# Argumen yang bukan angka; fungsi lain dipanggil dengan DEFAULT_ARGUMENT
+ARGUMENTS = {
+    "password": "Rahasia123",
+    "teks": "abc",
+    "data_mahasiswa": {"Budi": [80, 75, 90], "Sari": [55, 60, 40]},
+    "hasil": {"Budi": {"nilai": [80], "rata_rata": 80.0, "grade": "A", "status": "Lulus"}},
+}
+
+
+def corpus_cases(paths=CORPORA):
+    """(label, source, parameters) for every top-level function of the corpus files."""
+    cases = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            source = f.read()
+        module = os.path.splitext(os.path.basename(path))[0]
+        for node in ast.parse(source).body:
+            if not isinstance(node, ast.FunctionDef):
+                continue
+            parameters = {arg.arg: ARGUMENTS.get(arg.arg, DEFAULT_ARGUMENT) for arg in node.args.args}
+            cases.append((f"{module}:{node.name}", ast.get_source_segment(source, node) + "\n", parameters))
+    return cases
+
+
+def synthetic_cases(ifs, depths, loops):
+    return [(name, source, {"x": DEFAULT_ARGUMENT}) for name, source in synthetic.grid(ifs, depths, loops)]
+
+
+def timed(fn, rounds):
+    samples = []
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return result, samples
+
+
+def bench_case(source, parameters, rounds):
+    timings = {}
+    cfg, timings["build_cfg"] = timed(lambda: build_cfg(source), rounds)
+    if "message" in cfg:
+        return {"error": cfg["message"]}
+    paths, timings["paths"] = timed(lambda: generate_execution_paths(cfg), rounds)
+    cfg["execution_paths"] = paths
+    _, timings["unreachable"] = timed(lambda: detect_unreachable_code(cfg), rounds)
+    # Output print() dari kode yang diuji dibuang agar tidak membanjiri laporan
+    with redirect_stdout(io.StringIO()):
+        execution, timings["execute"] = timed(lambda: test_code_with_parameters(source, parameters), rounds)
+        _, timings["trace"] = timed(lambda: trace_execution_path(source, parameters), rounds)
+    return {
+        "nodes": len(cfg["nodes"]),
+        "edges": len(cfg["edges"]),
+        "paths": len(paths),
+        "executed": execution["success"],
+        "stages": {
+            name: {
+                "min_ms": round(min(samples) * 1000, 4),
+                "median_ms": round(statistics.median(samples) * 1000, 4),
+            }
+            for name, samples in timings.items()
+        },
+    }
+
+
+def run(cases, rounds):
+    return {name: bench_case(source, parameters, rounds) for name, source, parameters in cases}
+
+
+def baseline_document(results, rounds):
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rounds": rounds,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, results, threshold, min_ms):
+    """Stages slower than the baseline by more than threshold; min_ms is compared (least noisy)."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before or "stages" not in before or "stages" not in result:
+            continue
+        for stage, timing in result["stages"].items():
+            old = before["stages"].get(stage)
+            if not old or old["min_ms"] <= 0:
+                continue
+            new = timing["min_ms"]
+            ratio = new / old["min_ms"]
+            if ratio > 1 + threshold and max(new, old["min_ms"]) >= min_ms:
+                regressions.append({"case": name, "stage": stage, "baseline_ms": old["min_ms"],
+                                    "current_ms": new, "ratio": round(ratio, 2)})
+    return regressions
+
+
+def print_table(results):
+    header = f"{'case':<42} {'nodes':>6} {'paths':>7}" + "".join(f" {stage + ' ms':>13}" for stage in STAGES)
+    print(header)
+    for name, r in results.items():
+        if "error" in r:
+            print(f"{name:<42} {r['error']}")
+            continue
+        cells = "".join(f" {r['stages'][stage]['min_ms']:>13}" for stage in STAGES)
+        print(f"{name:<42} {r['nodes']:>6} {r['paths']:>7}{cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--ifs", type=int, nargs="*", default=[4, 8, 12])
+    parser.add_argument("--depth", type=int, nargs="*", default=[4, 16, 64])
+    parser.add_argument("--loops", type=int, nargs="*", default=[2, 4, 8])
+    parser.add_argument("--no-corpus", action="store_true", help="only run the synthetic programs")
+    parser.add_argument("--case", action="append", help="only run cases whose label contains this text")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--min-ms", type=float, default=0.5)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    cases = [] if args.no_corpus else corpus_cases()
+    cases += synthetic_cases(args.ifs, args.depth, args.loops)
+    if args.case:
+        cases = [case for case in cases if any(text in case[0] for text in args.case)]
+    if not cases:
+        sys.exit("No cases selected.")
+
+    results = run(cases, args.rounds)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline_document(results, args.rounds), f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(baseline, results, args.threshold, args.min_ms)
+        for r in regressions:
+            print(f"REGRESSION {r['case']} {r['stage']}: {r['baseline_ms']} ms -> {r['current_ms']} ms "
+                  f"(x{r['ratio']})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Replay captured requests against the app in-process and report latency.
+
+Reads JSONL records written by app/service/slow_requests.py, one file per
+server process (lines without method and path, or with a truncated body, are
+skipped) and sends them through httpx's ASGI transport, without a network or
+a running server.
+
+    python -m benchmarks.replay logs/slow_requests.*.jsonl [--concurrency 8] [--repeat 3]
+        [--db /tmp/replay.db] [--route /analyze/] [--json]
+
+Replayed writes (save_analysis, import, delete) hit the database, so pass
+--db to replay against a scratch copy instead of cfg.db.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import time
+from collections import Counter
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Jangan impor app.database di sini: path database dibaca saat modul itu diimpor
+DEFAULT_DB = os.path.join(BASE_DIR, "cfg.db")
+
+
+def load_records(paths, route=None):
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(record, dict) or "method" not in record or "path" not in record:
+                    continue
+                if record.get("body_truncated"):
+                    continue
+                if route and route not in (record.get("route"), record["path"]):
+                    continue
+                records.append(record)
+    return records
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3) if ordered else None,
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3) if ordered else None,
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3) if ordered else None,
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else None,
+    }
+
+
+async def replay(app, records, concurrency, repeat):
+    import httpx
+
+    from app.service.slow_requests import decode_body
+
+    queue = asyncio.Queue()
+    for _ in range(repeat):
+        for record in records:
+            queue.put_nowait(record)
+    results = []
+
+    async def worker(client):
+        while True:
+            try:
+                record = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            url = record["path"] + (f"?{record['query_string']}" if record.get("query_string") else "")
+            start = time.perf_counter()
+            try:
+                response = await client.request(
+                    record["method"], url, content=decode_body(record), headers=record.get("headers") or {}
+                )
+                status = response.status_code
+            except Exception:
+                status = None
+            results.append((record.get("route") or record["path"], status, time.perf_counter() - start))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    routes = {}
+    for route, _, seconds in results:
+        routes.setdefault(route, []).append(seconds)
+    return {
+        "requests": len(results),
+        "errors": sum(1 for _, status, _ in results if status is None or status >= 500),
+        # 429/413 dari admission control juga terlihat di sini
+        "statuses": dict(sorted(Counter(str(status) for _, status, _ in results).items())),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else None,
+        **summarize([seconds for _, _, seconds in results]),
+        "routes": {route: summarize(values) for route, values in sorted(routes.items())},
+    }
+
+
+async def run(args, records):
+    # Import setelah CFG_DB_PATH diset agar app memakai database yang benar
+    import main as application
+
+    async with application.lifespan(application.app):
+        return await replay(application.app, records, args.concurrency, args.repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--route", help="only replay this route template or path")
+    parser.add_argument("--db", help="replay against this SQLite file (copied from cfg.db if missing)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    records = load_records(args.files, args.route)
+    if not records:
+        sys.exit("No replayable records found.")
+
+    if args.db:
+        if not os.path.exists(args.db) and os.path.exists(DEFAULT_DB):
+            shutil.copyfile(DEFAULT_DB, args.db)
+        os.environ["CFG_DB_PATH"] = os.path.abspath(args.db)
+    # Replay sendiri tidak perlu dicatat lagi sebagai request lambat
+    os.environ["SLOW_REQUEST_MS"] = "0"
+
+    report = asyncio.run(run(args, records))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['requests']} requests, {report['errors']} errors, concurrency {report['concurrency']}, "
+          f"{report['seconds']} s, {report['throughput_rps']} req/s, statuses {report['statuses']}")
+    print(f"{'route':<40} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    rows = [("all", report)] + list(report["routes"].items())
+    for route, r in rows:
+        print(f"{route:<40} {r['count']:>6} {r['p50_ms']:>10} {r['p95_ms']:>10} {r['p99_ms']:>10} {r['max_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
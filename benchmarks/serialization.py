@@ -0,0 +1,91 @@
+"""Serialization time and payload size for /analyze/ responses.
+
+Graphs are built from kode_pengujian.py, repeated to get larger modules.
+
+    python -m benchmarks.serialization [--repeat 1 10 50] [--rounds 5]
+"""
+import argparse
+import json
+import os
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from app.service.cfg_builder import build_cfg
+from app.service.path_builder import generate_execution_paths
+from app.utils.serialization import dumps_json, msgpack, orjson
+from app.utils.wire_format import compact_cfg
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = os.path.join(BASE_DIR, "kode_pengujian.py")
+
+
+def corpus_source(repeat):
+    with open(CORPUS) as f:
+        source = f.read()
+    # Ganti nama fungsi agar setiap salinan jadi fungsi yang berbeda
+    return "\n".join(source.replace("def ", f"def v{i}_") for i in range(repeat))
+
+
+def analysis_payload(source):
+    cfg = build_cfg(source)
+    cfg["execution_paths"] = generate_execution_paths(cfg)
+    return cfg
+
+
+def fastapi_default(data):
+    # Jalur bawaan FastAPI: jsonable_encoder lalu json.dumps
+    return json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encoders():
+    backends = [("fastapi-default", fastapi_default)]
+    if orjson is not None:
+        backends.append(("orjson", dumps_json))
+    if msgpack is not None:
+        backends.append(("msgpack", lambda data: msgpack.packb(data, use_bin_type=True)))
+    return backends
+
+
+def timed(fn, data, rounds):
+    best = float("inf")
+    out = b""
+    for _ in range(rounds):
+        start = time.perf_counter()
+        out = fn(data)
+        best = min(best, time.perf_counter() - start)
+    return best, len(out)
+
+
+def run(repeats, rounds):
+    results = []
+    for repeat in repeats:
+        cfg = analysis_payload(corpus_source(repeat))
+        for shape, data in (("classic", cfg), ("compact", compact_cfg(cfg))):
+            for name, fn in encoders():
+                seconds, size = timed(fn, data, rounds)
+                results.append({
+                    "repeat": repeat,
+                    "nodes": len(cfg["nodes"]),
+                    "paths": len(cfg["execution_paths"]),
+                    "shape": shape,
+                    "encoder": name,
+                    "ms": round(seconds * 1000, 3),
+                    "bytes": size
+                })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'repeat':>6} {'nodes':>6} {'paths':>6} {'shape':<8} {'encoder':<16} {'ms':>9} {'bytes':>10}")
+    for r in run(args.repeat, args.rounds):
+        print(f"{r['repeat']:>6} {r['nodes']:>6} {r['paths']:>6} {r['shape']:<8} {r['encoder']:<16} {r['ms']:>9} {r['bytes']:>10}")
+
+
+if __name__ == "__main__":
+    main()
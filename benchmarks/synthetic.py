@@ -0,0 +1,72 @@
+"""Synthetic programs whose CFG size and path count grow with a few knobs.
+
+Every program is a single function of one integer argument x, so it can be
+built, enumerated, executed and traced like a user submission:
+
+    statements  s straight-line statements      -> 1 execution path
+    ifs         n sequential if/else blocks     -> 2**n execution paths
+    depth       d nested if statements          -> d + 1 execution paths
+    loops       k sequential for loops over x   -> k + 1 execution paths
+    body        statements inside every block (makes nodes heavier, not paths)
+"""
+
+INDENT = "    "
+
+
+def _block(lines, level, body, tag):
+    for j in range(body):
+        lines.append(f"{INDENT * level}total += {tag} + {j}")
+
+
+def straight_line(lines, count, level=1):
+    for i in range(count):
+        lines.append(f"{INDENT * level}total += x * {i}")
+
+
+def sequential_ifs(lines, count, level=1, body=1):
+    for i in range(count):
+        lines.append(f"{INDENT * level}if x % {i + 2} == 0:")
+        _block(lines, level + 1, body, i)
+        lines.append(f"{INDENT * level}else:")
+        _block(lines, level + 1, body, -i)
+
+
+def nested_ifs(lines, depth, level=1, body=1):
+    for i in range(depth):
+        lines.append(f"{INDENT * (level + i)}if x > {i}:")
+        _block(lines, level + i + 1, body, i)
+
+
+def sequential_loops(lines, count, level=1, body=1):
+    for i in range(count):
+        lines.append(f"{INDENT * level}for i{i} in range(x):")
+        _block(lines, level + 1, body, f"i{i}")
+
+
+def program(statements=0, ifs=0, depth=0, loops=0, body=1, name="synthetic"):
+    """Source of one function combining the requested shapes, in that order."""
+    lines = [f"def {name}(x):", f"{INDENT}total = 0"]
+    straight_line(lines, statements)
+    sequential_ifs(lines, ifs, body=body)
+    nested_ifs(lines, depth, body=body)
+    sequential_loops(lines, loops, body=body)
+    lines.append(f"{INDENT}return total")
+    return "\n".join(lines) + "\n"
+
+
+def label(statements=0, ifs=0, depth=0, loops=0, body=1):
+    knobs = (("statements", statements), ("ifs", ifs), ("depth", depth), ("loops", loops))
+    parts = [f"{knob}={value}" for knob, value in knobs if value]
+    if body != 1:
+        parts.append(f"body={body}")
+    return "synthetic:" + ",".join(parts or ["empty"])
+
+
+def grid(ifs=(), depths=(), loops=(), body=1, statements=()):
+    """(label, source) for every size of each knob on its own."""
+    cases = []
+    for knob, values in (("statements", statements), ("ifs", ifs), ("depth", depths), ("loops", loops)):
+        for value in values:
+            options = {knob: value, "body": body}
+            cases.append((label(**options), program(**options)))
+    return cases
@@ -1,21 +1,80 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer, undefer_group
 from fastapi import Depends
-from app.database import SessionLocal, engine
-from app.model.models import Project, Code
-import json
-from app.service.cfg_builder import build_cfg
+from starlette.concurrency import run_in_threadpool
+from app.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.model.models import AnalysisJob, Project, Code, ProjectStats
+from app.service.cfg_builder import build_cfg, shutdown_pool
 from app.service.path_builder import generate_execution_paths
-from app.utils.unreachable_nodes import detect_unreachable_code
+from app.service.analysis import analyze_source
+from app.service.job_queue import (
+    FINISHED,
+    QUEUED,
+    RUNNING,
+    JobWorkers,
+    count_jobs,
+    enqueue_job,
+    iter_job_events,
+    job_state,
+)
+from app.service import instrumentation
+from app.service.instrumentation import MetricsMiddleware, instrument_engine, observe_cache, stage
+from app.service.profiling import ProfileMiddleware, ServerTimingMiddleware
+from app.service.slow_requests import SlowRequestMiddleware
+from app.utils import metrics
+from app.service import admission
+from app.service.admission import AdmissionRejected
+from app.service.cost_model import MAX_AST_NODES, estimate_cost, public_estimate
+from app.utils.wire_format import COMPACT_MEDIA_TYPE, compact_cfg, wants_compact
+from app.utils.serialization import render
+from app.utils.single_flight import SingleFlight, source_key
+from app.utils.cancellation import cancel_on_disconnect, run_cancellable
+from app.service.project_export import (
+    export_code_record,
+    export_project_record,
+    gzip_stream,
+    iter_export_json,
+    iter_export_ndjson,
+)
+from app.service.project_import import (
+    ImportFormatError,
+    import_records,
+    iter_export_document,
+    iter_ndjson,
+)
+from app.service.group_commit import GroupCommitWriter
+from app.service.blob_store import BLOB_LOAD_OPTIONS, dedupe_payloads
+from app.model.schema import upgrade_schema
+from app.service import search_index, similarity
+from app.service.code_index import index_new_codes
+from app.service import revisions
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    InvalidCursor,
+    keyset_page,
+    page_result,
+)
 from app.model.request_model import CodeRequest, TestCaseRequest
-from app.service.execution_tester import test_code_with_parameters, trace_execution_path
+from app.service.execution_sandbox import ExecutionFailed, run_execution
 from app.model import models
 from app.model.request_model import ProjectCreate
 from app.model.request_model import SaveAnalysisRequest
-from typing import List
+from app.model.request_model import BulkDeleteRequest
+from typing import List, Optional
+from contextlib import asynccontextmanager
+from functools import partial
 
 models.Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+with engine.begin() as connection:
+    search_index.ensure_search_index(connection)
+    similarity.ensure_fingerprints(connection)
 
 def get_db():
     db = SessionLocal()
@@ -24,7 +83,35 @@ def get_db():
     finally:
         db.close()
 
-app = FastAPI()
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Semua insert save_analysis lewat satu writer agar di-commit per batch
+code_writer = GroupCommitWriter(
+    async_engine, Code, prepare=dedupe_payloads, after_insert=index_new_codes
+)
+
+analysis_flight = SingleFlight()
+
+# Worker proses terpisah untuk /jobs/analyze
+job_workers = JobWorkers(engine)
+
+async def ensure_job_workers():
+    # a2wsgi (Passenger) tidak mengirim event lifespan: worker dinyalakan saat job pertama
+    await run_in_threadpool(job_workers.start)
+
+@asynccontextmanager
+async def lifespan(app):
+    job_workers.start()
+    yield
+    await code_writer.close()
+    job_workers.stop()
+    shutdown_pool()
+
+app = FastAPI(lifespan=lifespan)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
 origins = [
     "http://localhost:5173",
@@ -39,169 +126,426 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Urutan luar ke dalam: metrics, log request lambat, profile, Server-Timing, CORS
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(ProfileMiddleware)
+app.add_middleware(SlowRequestMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+instrumentation.queue_depth.labels("group_commit").set_function(lambda: code_writer.pending)
+instrumentation.queue_depth.labels("analysis_jobs").set_function(lambda: count_jobs(engine, QUEUED))
+instrumentation.jobs_running.set_function(lambda: count_jobs(engine, RUNNING))
+instrumentation.in_flight.set_function(lambda: len(analysis_flight))
+
+def analysis_values(request: SaveAnalysisRequest):
+    return dict(
+        name=request.name,
+        source_code=request.code,
+        path_list=request.path_list,
+        coverage_path=request.coverage_path,
+        cyclomatic_complexity=request.cyclomatic_complexity,
+        test_cases=request.test_cases,
+        
+        # Disimpan apa adanya; kolom CompressedJSON yang mengurus serialisasi
+        nodes_list=request.nodes, 
+        edges_list=request.edges
+    )
+
+@app.get("/metrics")
+def get_metrics():
+    # Fungsi sync: gauge antrean job menjalankan query, biarkan di threadpool
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/ping")
 async def ping():
     return {"status": "ok"}
 
 @app.post("/projects/")
-async def create_project(payload: ProjectCreate, db: Session = Depends(get_db)):
+async def create_project(payload: ProjectCreate, db: AsyncSession = Depends(get_async_db)):
     project = Project(name=payload.name, description=payload.description)
     db.add(project)
-    db.commit()
-    db.refresh(project)
+    await db.commit()
+    await db.refresh(project)
     return project
 
 @app.post("/projects/{project_id}/save_analysis/")
 async def save_analysis_to_project(
     project_id: int, 
     request: SaveAnalysisRequest, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found.")
+    if request.code_id is not None:
+        # Simpan ulang: riwayat dipertahankan sebagai revisi, bukan baris code baru
+        revision = await append_code_revision(db, request.code_id, request, project_id)
+        return {"message": "Saved", "code_id": request.code_id, "revision": revision}
+    # Lepas koneksi sesi dulu; writer butuh koneksi sendiri dari pool yang sama
+    await db.close()
 
-    code_record = Code(
-        name=request.name,
-        source_code=request.code,
-        project_id=project_id,
-        path_list=json.dumps(request.path_list),
-        coverage_path=request.coverage_path,
-        cyclomatic_complexity=request.cyclomatic_complexity,
-        test_cases=json.dumps(request.test_cases),
-        
-        # --- KONVERSI KE STRING ---
-        # Data [{id: "1"...}, {id: "2"...}] diubah jadi '[{"id": "1"...}]'
-        nodes_list=json.dumps(request.nodes), 
-        edges_list=json.dumps(request.edges)
-    )
+    code_id = await code_writer.insert(dict(analysis_values(request), project_id=project_id))
+
+    return {"message": "Saved", "code_id": code_id}
+
+async def append_code_revision(db: AsyncSession, code_id: int, request: SaveAnalysisRequest, project_id=None):
+    try:
+        revision = await db.run_sync(revisions.append_revision, code_id, analysis_values(request), project_id)
+    except IntegrityError as e:
+        await db.rollback()
+        # Hanya bentrok nomor revisi yang layak dicoba ulang; pelanggaran lain adalah error permanen
+        if not revisions.is_revision_conflict(e):
+            raise
+        # append_revision mengunci code lebih dulu; ini hanya tersisa bila lock itu dilewati
+        raise HTTPException(status_code=409, detail="Revisi bentrok dengan penyimpanan lain, coba lagi.")
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Analisis tidak ditemukan.")
+    await db.commit()
+    return revision
+
+@app.post("/codes/{code_id}/revisions/")
+async def save_code_revision(
+    code_id: int,
+    request: SaveAnalysisRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Simpan analisis sebagai revisi baru dari code yang sudah ada."""
+    revision = await append_code_revision(db, code_id, request)
+    return {"message": "Saved", "code_id": code_id, "revision": revision}
 
-    db.add(code_record)
-    db.commit()
-    db.refresh(code_record)
+@app.get("/codes/{code_id}/revisions/")
+async def get_code_revisions(code_id: int, db: AsyncSession = Depends(get_async_db)):
+    history = await db.run_sync(revisions.list_revisions, code_id)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Analisis tidak ditemukan.")
+    return {"code_id": code_id, "revisions": history}
 
-    return {"message": "Saved", "code_id": code_record.id}
+@app.get("/codes/{code_id}/revisions/{revision}")
+async def get_code_revision(
+    code_id: int,
+    revision: int,
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    record = await db.run_sync(revisions.get_revision, code_id, revision)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Revisi tidak ditemukan.")
+    return render(record, accept)
+
+@app.post("/projects/import")
+async def import_projects(request: Request, db: Session = Depends(get_db)):
+    """Import dokumen export (JSON) atau stream NDJSON, opsional gzip."""
+    content_type = request.headers.get("content-type", "")
+    gzipped = request.headers.get("content-encoding", "") == "gzip"
+    if NDJSON_MEDIA_TYPE in content_type:
+        records = iter_ndjson(request.stream(), gzipped)
+    else:
+        records = iter_export_document(request.stream(), gzipped)
+
+    try:
+        result = await import_records(db, records)
+    except ImportFormatError as e:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"message": "Imported", **result}
 
 @app.get("/projects/{project_id}/export/")
-async def export_project(project_id: int, db: Session = Depends(get_db)):
-    project = db.query(Project).filter(Project.id == project_id).first()
+async def export_project(
+    project_id: int,
+    stream: Optional[str] = None,
+    gzip: bool = False,
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found.")
 
+    # Streaming: ?stream=ndjson (atau Accept: application/x-ndjson) dan ?stream=json
+    if stream is None and accept and NDJSON_MEDIA_TYPE in accept:
+        stream = "ndjson"
+    if stream in ("ndjson", "json"):
+        if stream == "ndjson":
+            chunks = iter_export_ndjson(SessionLocal, project_id)
+            media_type = NDJSON_MEDIA_TYPE
+        else:
+            chunks = iter_export_json(SessionLocal, project_id)
+            media_type = "application/json"
+        headers = {}
+        if gzip:
+            chunks = gzip_stream(chunks)
+            headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+    codes = await db.scalars(
+        select(Code)
+        .where(Code.project_id == project_id)
+        .options(undefer_group("payload"), *BLOB_LOAD_OPTIONS)
+        .order_by(Code.id)
+    )
     data = {
         "project": {
-            "id": project.id,
-            "name": project.name,
-            "description": project.description,
-            "created_at": str(project.created_at),
-            "codes": []
+            **export_project_record(project),
+            "codes": [export_code_record(code) for code in codes]
         }
     }
 
-    for code in project.codes:
-        data["project"]["codes"].append({
-            "id": code.id,
-            "name": code.name,
-            "source_code": code.source_code,
-            "path_list": json.loads(code.path_list or "[]"),
-            "coverage_path": code.coverage_path,
-            "cyclomatic_complexity": code.cyclomatic_complexity,
-            "test_cases": json.loads(code.test_cases or "[]"),
-            
-            # --- KONVERSI BALIK KE ARRAY ---
-            # String JSON dari DB diubah kembali jadi Array Object untuk Frontend
-            "nodes_list": json.loads(code.nodes_list or "[]"),
-            "edges_list": json.loads(code.edges_list or "[]"),
-            
-            "created_at": str(code.created_at)
-        })
-
-    return data
+    return render(data, accept)
 
 @app.get("/projects/")
-async def get_all_projects(db: Session = Depends(get_db)):
-    projects = db.query(Project).order_by(Project.created_at.desc()).all()
-    return [
-        {
-            "id": p.id,
-            "name": p.name,
-            "description": p.description,
-            "created_at": p.created_at,
-        }
-        for p in projects
-    ]
+async def get_all_projects(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    columns = select(Project.id, Project.name, Project.description, Project.created_at)
 
-@app.delete("/projects/{project_id}")
-async def delete_project(project_id: int, db: Session = Depends(get_db)):
-    project = db.query(Project).filter(Project.id == project_id).first()
+    # Tanpa limit/cursor tetap mengembalikan list penuh seperti sebelumnya
+    if limit is None and cursor is None:
+        rows = await db.execute(columns.order_by(Project.created_at.desc()))
+        return [dict(row._mapping) for row in rows]
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    try:
+        stmt = keyset_page(columns, Project.created_at, Project.id, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = (await db.execute(stmt)).all()
+    return page_result(rows, limit)
+
+@app.get("/projects/{project_id}/codes/")
+async def get_project_codes(
+    project_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Daftar analisis dalam project tanpa source/graph (pakai export untuk isi lengkap)."""
+    project = await db.get(Project, project_id)
     if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+        raise HTTPException(status_code=404, detail="Project not found.")
+
+    columns = select(
+        Code.id,
+        Code.name,
+        Code.coverage_path,
+        Code.cyclomatic_complexity,
+        Code.created_at,
+    ).where(Code.project_id == project_id)
+    try:
+        stmt = keyset_page(columns, Code.created_at, Code.id, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = (await db.execute(stmt)).all()
+    return page_result(rows, limit)
+
+@app.get("/search/")
+async def search_codes(
+    q: str = Query(..., min_length=1),
+    project_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Cari analisis berdasarkan nama, source code dan label node (FTS5, urut bm25)."""
+    if not search_index.search_enabled:
+        raise HTTPException(status_code=501, detail="Full-text search is not available.")
+    query = search_index.match_query(q)
+    if not query:
+        raise HTTPException(status_code=400, detail="Empty search query.")
 
-    db.delete(project)
-    db.commit()
+    params = {"query": query, "limit": limit + 1, "offset": offset}
+    if project_id is not None:
+        params["project_id"] = project_id
+    rows = (await db.execute(search_index.search_statement(project_id), params)).all()
+    return {
+        "items": [dict(row._mapping) for row in rows[:limit]],
+        "next_offset": offset + limit if len(rows) > limit else None,
+    }
+
+@app.get("/codes/{code_id}/similar/")
+async def get_similar_codes(
+    code_id: int,
+    min_similarity: float = Query(0.5, ge=0, le=1),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Analisis lain dengan struktur CFG identik/mirip (WL hash + MinHash LSH)."""
+    results = await similarity.find_similar(db, code_id, min_similarity, limit)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Analisis tidak ditemukan atau tidak punya graph.")
+    return {"code_id": code_id, "similar": results}
+
+@app.get("/projects/{project_id}/stats/")
+async def get_project_stats(project_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Ringkasan project dari tabel project_stats, tanpa membaca tabel codes."""
+    stats = await db.get(ProjectStats, project_id)
+    if stats is None:
+        if await db.get(Project, project_id) is None:
+            raise HTTPException(status_code=404, detail="Project not found.")
+        stats = ProjectStats(
+            project_id=project_id, code_count=0, coverage_sum=0, coverage_count=0,
+            complexity_sum=0, complexity_count=0, complexity_low=0,
+            complexity_moderate=0, complexity_high=0, complexity_very_high=0
+        )
+
+    return {
+        "project_id": project_id,
+        "code_count": stats.code_count,
+        "average_coverage_path": stats.coverage_sum / stats.coverage_count if stats.coverage_count else None,
+        "average_cyclomatic_complexity": stats.complexity_sum / stats.complexity_count if stats.complexity_count else None,
+        "complexity_distribution": {
+            "1-10": stats.complexity_low,
+            "11-20": stats.complexity_moderate,
+            "21-50": stats.complexity_high,
+            ">50": stats.complexity_very_high,
+        },
+    }
+
+@app.delete("/projects/{project_id}")
+async def delete_project(project_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Satu DELETE; codes ikut terhapus lewat ON DELETE CASCADE di database
+    result = await db.execute(delete(Project).where(Project.id == project_id))
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Project not found")
+    await db.commit()
     return {"message": "Project deleted successfully"}
 
 @app.delete("/codes/{code_id}/")
-async def delete_code_analysis(code_id: int, db: Session = Depends(get_db)):
+async def delete_code_analysis(code_id: int, db: AsyncSession = Depends(get_async_db)):
     """Hapus satu record analisis berdasarkan ID."""
-    code = db.query(Code).filter(Code.id == code_id).first()
-    if not code:
+    result = await db.execute(delete(Code).where(Code.id == code_id))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Analisis tidak ditemukan.")
-    db.delete(code)
-    db.commit()
+    await db.commit()
     return {"message": "Analisis berhasil dihapus", "deleted_id": code_id}
 
-@app.get("/projects/{project_id}/export/")
-async def export_project(project_id: int, db: Session = Depends(get_db)):
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found.")
-
-    data = {
-        "project": {
-            "id": project.id,
-            "name": project.name,
-            "description": project.description,
-            "created_at": str(project.created_at),
-            "codes": []
-        }
+@app.post("/bulk_delete/")
+async def bulk_delete(request: BulkDeleteRequest, db: AsyncSession = Depends(get_async_db)):
+    """Hapus banyak project dan/atau analisis sekaligus dalam satu transaksi."""
+    deleted_projects = 0
+    deleted_codes = 0
+    if request.project_ids:
+        result = await db.execute(delete(Project).where(Project.id.in_(request.project_ids)))
+        deleted_projects = result.rowcount
+    if request.code_ids:
+        result = await db.execute(delete(Code).where(Code.id.in_(request.code_ids)))
+        deleted_codes = result.rowcount
+    await db.commit()
+    return {
+        "message": "Bulk delete finished",
+        "deleted_projects": deleted_projects,
+        "deleted_codes": deleted_codes,
     }
 
-    for code in project.codes:
-        data["project"]["codes"].append({
-            "id": code.id,
-            "name": code.name,
-            "source_code": code.source_code,
-            "path_list": json.loads(code.path_list or "[]"),
-            "coverage_path": code.coverage_path,
-            "cyclomatic_complexity": code.cyclomatic_complexity,
-            "test_cases": json.loads(code.test_cases or "[]"),
-            "created_at": str(code.created_at)
-        })
+async def admit_analysis(
+    http_request: Request, code: str, allow_job: bool = False, shared_key=None, queue: bool = False
+):
+    """Estimasi biaya analisis lalu tagih ke kuota klien; hasilnya (mode, estimasi).
 
-    return data
+    shared_key: kunci single-flight; jika analisis identik sedang berjalan, hanya biaya estimasi yang ditagih.
+    queue: request pasti masuk antrean job; CFG tidak dibangun di sini, batas path dicek worker.
+    """
+    # Dicek sebelum estimasi: yang menumpang tidak perlu membangun CFG yang sama lagi
+    shared = shared_key is not None and analysis_flight.in_flight(shared_key)
+    # AST dihitung dulu (murah); CFG (kuadratik) hanya dibangun untuk request yang bisa dijawab langsung
+    estimate = await run_cancellable(partial(estimate_cost, shallow=True), code)
+    queue = queue or admission.queue_without_cfg(estimate, allow_job)
+    if not (shared or queue) and estimate is not None and estimate["ast_nodes"] <= MAX_AST_NODES:
+        estimate = await run_cancellable(estimate_cost, code)
+    try:
+        mode = admission.admit(admission.client_key(http_request), estimate, allow_job, shared, queue)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+    return mode, estimate
 
 @app.post("/analyze/")
-async def analyze_code(request: CodeRequest):
-    code = request.code
-    cfg = build_cfg(code)
+async def analyze_code(
+    request: CodeRequest,
+    http_request: Request,
+    format: Optional[str] = None,
+    accept: Optional[str] = Header(None)
+):
+    key = source_key("analyze", request.code)
+    mode, estimate = await admit_analysis(http_request, request.code, allow_job=True, shared_key=key)
+    if mode == admission.JOB:
+        # Terlalu mahal untuk dijawab langsung: dialihkan ke antrean job
+        async with AsyncSessionLocal() as db:
+            job = await enqueue_job(db, request.code)
+        await ensure_job_workers()
+        return JSONResponse(
+            status_code=202,
+            content={
+                "message": "Analysis queued as a background job.",
+                "job_id": job.id,
+                "status": job.status,
+                "estimate": public_estimate(estimate),
+            },
+            headers={"Location": f"/jobs/{job.id}"},
+        )
+
+    # Request identik yang datang bersamaan (satu kelas mengirim kode yang sama)
+    # menunggu satu komputasi yang sama; komputasi dihentikan jika semua kliennya putus
+    analyze = partial(analyze_source, cfg=estimate["cfg"] if estimate else None)
+    observe_cache("single_flight", *((1, 0) if analysis_flight.in_flight(key) else (0, 1)))
+    cfg = await cancel_on_disconnect(http_request, analysis_flight.join(key, run_cancellable, analyze, request.code))
     
-    if cfg is None or "message" in cfg:
+    if cfg is None:
         return {"message": "Unable to process the code."}
+
+    # Format ringkas hanya jika diminta lewat ?format=compact atau header Accept
+    if wants_compact(format, accept):
+        return render(compact_cfg(cfg), accept, COMPACT_MEDIA_TYPE)
         
-    paths = generate_execution_paths(cfg)
-    cfg["execution_paths"] = paths
-    
-    # Calculate cyclomatic complexity: E - N + 2
-    cfg["cyclomatic_complexity"] = len(cfg["edges"]) - len(cfg["nodes"]) + 2
-    cfg["nodes_count"] = len(cfg["nodes"])
-    cfg["edges_count"] = len(cfg["edges"])
-    
-    unreachable = detect_unreachable_code(cfg)
-    cfg["unreachable_code"] = unreachable
-        
-    return cfg
+    return render(cfg, accept)
+
+@app.post("/jobs/analyze", status_code=202)
+async def create_analysis_job(
+    request: CodeRequest,
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Antrekan analisis; hasil diambil lewat GET /jobs/{id} atau stream /jobs/{id}/events."""
+    await admit_analysis(http_request, request.code, allow_job=True, queue=True)
+    job = await enqueue_job(db, request.code)
+    await ensure_job_workers()
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/jobs/{job_id}")
+async def get_analysis_job(
+    job_id: int,
+    format: Optional[str] = None,
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    job = await db.get(AnalysisJob, job_id, options=[undefer(AnalysisJob.result)])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if job.status not in FINISHED:
+        # Job yang tertinggal dari proses sebelumnya tetap dikerjakan
+        await ensure_job_workers()
+
+    state = job_state(job, include_result=job.status in FINISHED)
+    if state.get("result") and wants_compact(format, accept):
+        state["result"] = compact_cfg(state["result"])
+        return render(state, accept, COMPACT_MEDIA_TYPE)
+    return render(state, accept)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_analysis_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    if not await db.get(AnalysisJob, job_id):
+        raise HTTPException(status_code=404, detail="Job not found.")
+    await db.close()
+    await ensure_job_workers()
+    return StreamingResponse(
+        iter_job_events(AsyncSessionLocal, job_id),
+        media_type="text/event-stream",
+        # Proxy (nginx) tidak boleh menahan event di buffer
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # @app.post("/projects/{project_id}/save_analysis/")
 # async def save_analysis_to_project(project_id: int, request: SaveAnalysisRequest, db: Session = Depends(get_db)):
@@ -228,25 +572,36 @@ async def analyze_code(request: CodeRequest):
 #     return {"message": "Analysis saved successfully.", "code_id": code_record.id}
 
 @app.post("/test_execution/")
-async def test_execution_code(request: TestCaseRequest):
+async def test_execution_code(
+    request: TestCaseRequest,
+    http_request: Request,
+    accept: Optional[str] = Header(None)
+):
+    _, estimate = await admit_analysis(http_request, request.code)
+    cfg = estimate["cfg"] if estimate else None
+
+    # Enumerasi path dan proses eksekusi dihentikan begitu klien memutus koneksi
+    return await cancel_on_disconnect(http_request, run_test_execution(request, accept, cfg))
+
+async def run_test_execution(request: TestCaseRequest, accept: Optional[str], cfg=None):
     code = request.code
     parameters = request.parameters
     
     try:
-        # Build the CFG for the provided code
-        cfg = build_cfg(code)
+        # Build the CFG for the provided code (unless the cost estimate already did)
+        if cfg is None:
+            cfg = build_cfg(code)
         
         if cfg is None or "message" in cfg:
             raise HTTPException(status_code=400, detail="Unable to process the code.")
         
         # Generate execution paths based on the CFG
-        possible_paths = generate_execution_paths(cfg)
-        
-        # Test the actual execution with the provided parameters
-        execution_result = test_code_with_parameters(code, parameters)
+        with stage("paths"):
+            possible_paths = await run_cancellable(generate_execution_paths, cfg)
         
-        # Trace the exact execution path with the given parameters
-        actual_path = trace_execution_path(code, parameters)
+        # Test the actual execution with the provided parameters and trace the
+        # exact execution path, in a child process that is killed on disconnect
+        execution_result, actual_path = await run_execution(code, parameters)
         
         # Convert all path nodes to strings
         string_possible_paths = []
@@ -282,6 +637,10 @@ async def test_execution_code(request: TestCaseRequest):
             "actual_execution_path": formatted_actual_path
         }
         
-        return response
+        return render(response, accept)
+    except HTTPException:
+        raise
+    except ExecutionFailed as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
\ No newline at end of file